@@ -54,6 +54,15 @@ def build_parser() -> argparse.ArgumentParser:
         help="Optional cap on the number of session files to ingest \
             (applies only when --session is not provided).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=(
+            "Parse session files on this many worker processes while a single "
+            "writer stores them (applies only when --session is not provided)."
+        ),
+    )
     parser.add_argument(
         "--verbose",
         "-v",
@@ -94,6 +103,7 @@ def main() -> None:
         limit,
         verbose,
         config.ingest_batch_size,
+        workers=args.workers,
     )
     _report_many_results(summaries, database_path)
 
@@ -170,6 +180,8 @@ def _ingest_many_files(
     limit: int | None,
     verbose: bool,
     batch_size: int,
+    *,
+    workers: int | None = None,
 ) -> List[SessionSummary]:
     """Ingest multiple session files from a directory and return summaries."""
     try:
@@ -180,6 +192,7 @@ def _ingest_many_files(
                 limit=limit,
                 verbose=verbose,
                 batch_size=batch_size,
+                workers=workers,
             )
         )
     except SessionDiscoveryError as err:
@@ -10,8 +10,10 @@ from .db_utils import (
     EventInsert,
     FunctionCallInsert,
     FunctionCallOutputUpdate,
+    PendingWrites,
     PromptInsert,
     SAFE_COLUMNS,  # Explicitly import SAFE_COLUMNS
+    SafeColumn,
     SessionInsert,
     extract_session_details,
     extract_token_fields,
@@ -25,12 +27,14 @@ from .db_utils import (
     insert_token,
     insert_turn_context,
     json_dumps,
+    json_dumps_bytes,
     parse_prompt_message,
     update_function_call_output,
 )
 from .db_utils import DB_UTIL_EXPORTS
 from .event_handlers import (
     EventContext,
+    EventCounts,
     EventHandlerDeps,
     FunctionCallTracker,
     handle_event_msg,
@@ -46,8 +50,10 @@ __all__ = [
     "EventInsert",
     "FunctionCallInsert",
     "FunctionCallOutputUpdate",
+    "PendingWrites",
     "PromptInsert",
     "SAFE_COLUMNS",
+    "SafeColumn",
     "SessionInsert",
     "extract_session_details",
     "extract_token_fields",
@@ -61,10 +67,12 @@ __all__ = [
     "insert_token",
     "insert_turn_context",
     "json_dumps",
+    "json_dumps_bytes",
     "parse_prompt_message",
     "update_function_call_output",
     # Event Handlers
     "EventContext",
+    "EventCounts",
     "EventHandlerDeps",
     "FunctionCallTracker",
     "handle_event_msg",
@@ -7,13 +7,24 @@ Date: 2025-10-30
 
 from __future__ import annotations
 
+import importlib
 import json
-from dataclasses import dataclass
-from typing import Any
+import math
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+from itertools import chain
+from typing import Any, Iterator
+
+try:
+    _orjson: Any = importlib.import_module("orjson")
+except ModuleNotFoundError:  # pragma: no cover - exercised via test shim
+    _orjson = None
 
 
 DB_UTIL_EXPORTS: tuple[str, ...] = (
     "json_dumps",
+    "json_dumps_bytes",
     "extract_session_details",
     "extract_token_fields",
     "extract_turn_context",
@@ -25,6 +36,7 @@ DB_UTIL_EXPORTS: tuple[str, ...] = (
     "AgentReasoningInsert",
     "FunctionCallInsert",
     "FunctionCallOutputUpdate",
+    "PendingWrites",
     "insert_session",
     "insert_prompt",
     "insert_event",
@@ -34,18 +46,131 @@ DB_UTIL_EXPORTS: tuple[str, ...] = (
     "insert_function_plan",
     "insert_function_call",
     "update_function_call_output",
+    "SafeColumn",
     "SAFE_COLUMNS",
 )
 
-# Columns that accept sanitized user-supplied content; referenced when
-# documenting safeguards around SQL parameterization.
-SAFE_COLUMNS = frozenset(
-    (
-        "message",
-        "active_file",
-        "open_tabs",
-        "my_request",
+
+class SafeColumn(Enum):
+    """Columns that accept sanitized user-supplied content.
+
+    Members are vetted by construction, so passing one to :func:`safe_value`
+    skips the string allowlist lookup.
+    """
+
+    MESSAGE = "message"
+    ACTIVE_FILE = "active_file"
+    OPEN_TABS = "open_tabs"
+    MY_REQUEST = "my_request"
+
+
+# String form of SafeColumn for dynamic callers; referenced when documenting
+# safeguards around SQL parameterization.
+SAFE_COLUMNS = frozenset(column.value for column in SafeColumn)
+
+
+_SQL_INSERT_SESSION = """
+    INSERT INTO sessions (
+        file_id, session_id, session_timestamp, cwd, approval_policy,
+        sandbox_mode, network_access, raw_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_PROMPT = """
+    INSERT INTO prompts (
+        file_id, prompt_index, timestamp, message, active_file, open_tabs,
+        my_request, raw_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_EVENT = """
+    INSERT INTO events (
+        file_id, timestamp, event_type, category, priority, session_id, data,
+        raw_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_TOKEN = """
+    INSERT INTO token_messages (
+        prompt_id, timestamp,
+        primary_used_percent, primary_window_minutes, primary_resets,
+        secondary_used_percent, secondary_window_minutes, secondary_resets,
+        raw_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_TURN_CONTEXT = """
+    INSERT INTO turn_context_messages (
+        prompt_id, timestamp, cwd, approval_policy, sandbox_mode,
+        network_access, writable_roots, raw_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_REASONING = """
+    INSERT INTO agent_reasoning_messages (
+        prompt_id, timestamp, source, text, raw_json
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_PLAN = """
+    INSERT INTO function_plan_messages (
+        prompt_id, timestamp, name, arguments, raw_json
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+
+_SQL_INSERT_FUNCTION_CALL = """
+    INSERT INTO function_calls (
+        prompt_id, call_timestamp, output_timestamp, name, call_id,
+        arguments, output, raw_call_json, raw_output_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_UPDATE_FUNCTION_CALL_OUTPUT = """
+    UPDATE function_calls
+    SET output_timestamp = ?, output = ?, raw_output_json = ?
+    WHERE id = ?
+"""
+
+# Buffered inserts are flushed this many rows per statement. At most nine
+# columns per row keeps every statement under SQLite's historical limit of
+# 999 bound parameters.
+_MULTI_ROW_CHUNK = 50
+
+
+def _expand_values(sql: str, rows: int) -> str:
+    """Repeat the single ``VALUES (...)`` tuple of ``sql`` ``rows`` times."""
+
+    head, keyword, values = sql.rpartition("VALUES")
+    return f"{head}{keyword} " + ", ".join([values.strip()] * rows)
+
+
+# Multi-row forms of the statements PendingWrites buffers. Anything not listed
+# here (such as the output UPDATE) is flushed with executemany.
+_MULTI_ROW_SQL: dict[str, str] = {
+    sql: _expand_values(sql, _MULTI_ROW_CHUNK)
+    for sql in (
+        _SQL_INSERT_EVENT,
+        _SQL_INSERT_TOKEN,
+        _SQL_INSERT_TURN_CONTEXT,
+        _SQL_INSERT_REASONING,
+        _SQL_INSERT_PLAN,
     )
+}
+
+
+# First template header at the start of a line. Line boundaries mirror
+# str.splitlines() and ``\s`` mirrors str.strip(), so the match always begins
+# at a line that parse_prompt_message would treat as a header (or blank).
+_PROMPT_HEADER_RE = re.compile(
+    r"(?:\A|(?<=[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]))\s*"
+    r"## (?:Active file:|Open tabs:|My request for Codex:)"
+)
+
+# Environment context tags captured in a single forward scan of the text.
+_ENV_TAG_RE = re.compile(
+    r"<(cwd|approval_policy|sandbox_mode|network_access)>(.*?)</\1>",
+    re.DOTALL,
 )
 
 
@@ -63,17 +188,88 @@ def validate_safe_column(column: str) -> None:
         )
 
 
-def safe_value(column: str, value: Any) -> Any:
+def safe_value(column: SafeColumn | str, value: Any) -> Any:
     """Return value after verifying the destination column is permitted."""
 
-    validate_safe_column(column)
+    if not isinstance(column, SafeColumn):
+        validate_safe_column(column)
     return value
 
 
-def json_dumps(data: Any) -> str:
-    """Serialize payloads to JSON without forcing ASCII."""
+# Match orjson's compact separators so both encoders lay out stored JSON the
+# same way. Rows written before this change use the stdlib's ", " / ": "
+# separators; JSON readers (json_extract, json.loads) treat both identically.
+_JSON_SEPARATORS = (",", ":")
+
 
-    return json.dumps(data, ensure_ascii=False)
+def _null_non_finite(value: Any) -> Any:
+    """Return ``value`` with NaN and infinite floats replaced by ``None``."""
+
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _null_non_finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_null_non_finite(item) for item in value]
+    return value
+
+
+def _stdlib_json_dumps(data: Any) -> str:
+    """Serialize with the stdlib encoder using orjson's separators and nulls."""
+
+    try:
+        return json.dumps(
+            data, ensure_ascii=False, separators=_JSON_SEPARATORS, allow_nan=False
+        )
+    except ValueError:
+        # orjson writes non-finite floats as null; the stdlib would emit the
+        # non-standard NaN/Infinity tokens, so null them out and retry.
+        try:
+            cleaned = _null_non_finite(data)
+        except RecursionError:
+            raise ValueError("Circular reference detected") from None
+        return json.dumps(cleaned, ensure_ascii=False, separators=_JSON_SEPARATORS)
+
+
+def json_dumps(data: Any) -> str:
+    """Serialize payloads to compact JSON text without forcing ASCII.
+
+    Stored JSON columns stay TEXT so SQLite's JSON functions and the Postgres
+    migration keep reading them as strings; the single decode here is the only
+    conversion between orjson's bytes and the bound value.
+
+    The stdlib fallback uses the same compact separators and writes NaN and
+    Infinity as ``null``, so both encoders produce JSON that decodes to the
+    same values. The text itself can still differ in float spelling: orjson
+    writes ``1e-7`` and ``0.00001`` where the stdlib writes ``1e-07`` and
+    ``1e-05``.
+    """
+
+    if _orjson is not None:
+        try:
+            text: str = _orjson.dumps(data, option=_orjson.OPT_NON_STR_KEYS).decode()
+            return text
+        except TypeError:
+            pass
+    return _stdlib_json_dumps(data)
+
+
+def json_dumps_bytes(data: Any) -> bytes:
+    """Serialize payloads to UTF-8 JSON bytes, preferring orjson when present.
+
+    Falls back to the stdlib encoder when orjson is unavailable or rejects the
+    payload (for example integers wider than 64 bits). Output decodes to the
+    same values either way; see :func:`json_dumps` for the float spelling
+    differences.
+    """
+
+    if _orjson is not None:
+        try:
+            encoded: bytes = _orjson.dumps(data, option=_orjson.OPT_NON_STR_KEYS)
+            return encoded
+        except TypeError:
+            pass
+    return _stdlib_json_dumps(data).encode("utf-8")
 
 
 def extract_tag_value(text: str, tag: str) -> str | None:
@@ -92,7 +288,11 @@ def extract_tag_value(text: str, tag: str) -> str | None:
 
 
 def extract_session_details(prelude: list[dict]) -> dict[str, Any]:
-    """Derive session metadata from the prelude events."""
+    """Derive session metadata from the prelude events.
+
+    Later events take precedence, so the prelude is scanned newest first and
+    the scan stops as soon as every field has been settled.
+    """
 
     details: dict[str, Any] = {
         "session_id": None,
@@ -102,63 +302,75 @@ def extract_session_details(prelude: list[dict]) -> dict[str, Any]:
         "sandbox_mode": None,
         "network_access": None,
     }
+    meta_found = False
+    env_found = False
 
-    for event in prelude:
+    for event in reversed(prelude):
         event_type = event.get("type")
-        payload = event.get("payload")
-        if event_type == "session_meta" and isinstance(payload, dict):
-            details["session_id"] = payload.get("id")
-            details["session_timestamp"] = payload.get("timestamp") or event.get(
-                "timestamp"
-            )
-            details["cwd"] = payload.get("cwd") or details["cwd"]
-        elif (
-            event_type == "response_item"
-            and isinstance(payload, dict)
-            and payload.get("type") == "message"
-        ):
-            _extract_env_context(payload, details)
+        if event_type == "session_meta":
+            payload = event.get("payload")
+            if not isinstance(payload, dict):
+                continue
+            if not meta_found:
+                meta_found = True
+                details["session_id"] = payload.get("id")
+                details["session_timestamp"] = payload.get("timestamp") or event.get(
+                    "timestamp"
+                )
+            if details["cwd"] is None:
+                details["cwd"] = payload.get("cwd") or None
+        elif event_type == "response_item":
+            payload = event.get("payload")
+            if not isinstance(payload, dict) or payload.get("type") != "message":
+                continue
+            for found in _iter_env_context(payload):
+                if not env_found:
+                    env_found = True
+                    details["approval_policy"] = found.get("approval_policy")
+                    details["sandbox_mode"] = found.get("sandbox_mode")
+                    details["network_access"] = found.get("network_access")
+                if details["cwd"] is None:
+                    details["cwd"] = found.get("cwd") or None
+                if details["cwd"] is not None:
+                    break
+        else:
+            continue
+        if meta_found and env_found and details["cwd"] is not None:
+            break
 
     return details
 
 
-def _extract_env_context(payload: dict, details: dict[str, Any]) -> None:
-    """Populate environment details from message payload."""
+def _iter_env_context(payload: dict) -> Iterator[dict[str, str]]:
+    """Yield environment_context tags from a message, newest item first."""
 
     content = payload.get("content")
     if not isinstance(content, list):
         return
-    for item in content:
+    for item in reversed(content):
         if not isinstance(item, dict):
             continue
         text = item.get("text")
         if not isinstance(text, str) or "<environment_context>" not in text:
             continue
-        details["cwd"] = extract_tag_value(text, "cwd") or details["cwd"]
-        details["approval_policy"] = extract_tag_value(
-            text,
-            "approval_policy",
-        )
-        details["sandbox_mode"] = extract_tag_value(text, "sandbox_mode")
-        details["network_access"] = extract_tag_value(
-            text,
-            "network_access",
-        )
+        found: dict[str, str] = {}
+        for match in _ENV_TAG_RE.finditer(text):
+            # First occurrence wins, matching extract_tag_value.
+            found.setdefault(match.group(1), match.group(2).strip())
+        yield found
 
 
 def extract_token_fields(payload: dict) -> dict[str, Any]:
     """Normalize token count payload for insertion."""
 
-    primary = (
-        payload.get("rate_limits", {}).get("primary", {})
-        if isinstance(payload, dict)
-        else {}
-    )
-    secondary = (
-        payload.get("rate_limits", {}).get("secondary", {})
-        if isinstance(payload, dict)
-        else {}
-    )
+    # EAFP keeps the common token_count shape free of isinstance checks; any
+    # missing, null, or non-mapping level falls back to empty limits.
+    try:
+        rate_limits = payload["rate_limits"]
+        primary = rate_limits.get("primary") or {}
+        secondary = rate_limits.get("secondary") or {}
+    except (TypeError, KeyError, AttributeError):
+        primary = secondary = {}
     return {
         "primary_used_percent": primary.get("used_percent"),
         "primary_window_minutes": primary.get("window_minutes"),
@@ -187,20 +399,24 @@ def extract_turn_context(payload: dict) -> dict[str, Any]:
 
 
 def get_reasoning_text(payload: dict) -> str | None:
-    """Extract reasoning text from payload if present."""
+    """Extract reasoning text from payload if present.
+
+    ``str.isspace`` matches the characters ``str.strip`` removes, so the
+    blank checks below avoid allocating stripped copies.
+    """
 
     text = payload.get("text")
-    if isinstance(text, str) and text.strip():
+    if isinstance(text, str) and text and not text.isspace():
         return text
     summary = payload.get("summary")
     if isinstance(summary, list) and summary:
         entry = summary[0]
         if isinstance(entry, dict):
             text = entry.get("text")
-            if isinstance(text, str) and text.strip():
+            if isinstance(text, str) and text and not text.isspace():
                 return text
     content = payload.get("content")
-    if isinstance(content, str) and content.strip():
+    if isinstance(content, str) and content and not content.isspace():
         return content
     return None
 
@@ -213,12 +429,18 @@ def parse_prompt_message(
     if not message:
         return None, None, None
 
+    # Lines before the first header never contribute; skip them in C and
+    # return immediately for free-form prompts that use no template.
+    header = _PROMPT_HEADER_RE.search(message)
+    if header is None:
+        return None, None, None
+
     active_file: str | None = None
     open_tabs: list[str] = []
     my_request_lines: list[str] = []
 
     state: str | None = None
-    for line in message.splitlines():
+    for line in message[header.start() :].splitlines():
         stripped = line.strip()
         if stripped.startswith("## Active file:"):
             active_file = stripped[len("## Active file:") :].strip() or None
@@ -232,7 +454,9 @@ def parse_prompt_message(
             continue
         if state == "open_tabs":
             if stripped.startswith("-"):
-                open_tabs.append(stripped[1:].strip())
+                tab = stripped[1:].strip()
+                if tab:
+                    open_tabs.append(tab)
                 continue
             if stripped.startswith("## ") or stripped == "":
                 state = None
@@ -243,16 +467,17 @@ def parse_prompt_message(
             if stripped.startswith("## "):
                 state = None
                 continue
-            my_request_lines.append(line.rstrip())
+            # Blank lines are dropped from the joined request, so only keep
+            # the lines that contribute instead of filtering at the end.
+            if stripped:
+                my_request_lines.append(line.rstrip())
 
-    open_tabs_value = "\n".join(tab for tab in open_tabs if tab) or None
-    my_request_value = (
-        "\n".join(line for line in my_request_lines if line).strip() or None
-    )
+    open_tabs_value = "\n".join(open_tabs) or None
+    my_request_value = "\n".join(my_request_lines).strip() or None
     return active_file, open_tabs_value, my_request_value
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionInsert:
     """Context for inserting session-level metadata."""
 
@@ -261,7 +486,7 @@ class SessionInsert:
     prelude: list[dict]
 
 
-@dataclass
+@dataclass(slots=True)
 class PromptInsert:
     """Context for inserting a user prompt."""
 
@@ -273,7 +498,7 @@ class PromptInsert:
     raw: dict
 
 
-@dataclass
+@dataclass(slots=True)
 class EventInsert:
     """Context for inserting an event related to a prompt."""
 
@@ -283,51 +508,55 @@ class EventInsert:
     timestamp: str | None
     payload: dict
     raw: dict
+    # Serialized ``raw``; filled lazily so handlers that persist the same
+    # event into several tables encode it only once.
+    raw_json: str | None = field(default=None, kw_only=True)
+
+
+def _raw_json(ctx: EventInsert | FunctionCallOutputUpdate) -> str:
+    """Return the serialized raw event, memoizing it on the context."""
+
+    if ctx.raw_json is None:
+        ctx.raw_json = json_dumps(ctx.raw)
+    return ctx.raw_json
+
+
+def _event_row(ctx: EventInsert) -> tuple[Any, ...]:
+    """Build the bound parameters for an events row."""
+
+    payload = ctx.payload
+    get = payload.get
+    return (
+        ctx.file_id,
+        ctx.timestamp,
+        get("type", "unknown"),
+        get("category", "other"),
+        get("priority", "medium"),
+        get("session_id"),
+        json_dumps(payload),
+        _raw_json(ctx),
+    )
 
 
 def insert_event(ctx: EventInsert) -> None:
     """Insert a base event record."""
 
-    cursor = ctx.conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO events (
-            file_id,
-            timestamp,
-            event_type,
-            category,
-            priority,
-            session_id,
-            data,
-            raw_json
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            ctx.file_id,
-            ctx.timestamp,
-            ctx.payload.get("type", "unknown"),
-            ctx.payload.get("category", "other"),
-            ctx.payload.get("priority", "medium"),
-            ctx.payload.get("session_id"),
-            json_dumps(ctx.payload),
-            json_dumps(ctx.raw),
-        ),
-    )
+    ctx.conn.execute(_SQL_INSERT_EVENT, _event_row(ctx))
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentReasoningInsert(EventInsert):
     """Context for inserting agent reasoning content."""
 
     source: str
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCallInsert(EventInsert):
     """Context for inserting a function call event."""
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCallOutputUpdate:
     """Context for updating a function call with output details."""
 
@@ -336,6 +565,7 @@ class FunctionCallOutputUpdate:
     timestamp: str | None
     payload: dict
     raw: dict
+    raw_json: str | None = field(default=None, kw_only=True)
 
 
 def insert_session(context: SessionInsert) -> None:
@@ -343,12 +573,7 @@ def insert_session(context: SessionInsert) -> None:
 
     details = extract_session_details(context.prelude)
     context.conn.execute(
-        """
-        INSERT INTO sessions (
-            file_id, session_id, session_timestamp, cwd, approval_policy,
-            sandbox_mode, network_access, raw_json
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        _SQL_INSERT_SESSION,
         (
             context.file_id,
             details["session_id"],
@@ -367,116 +592,224 @@ def insert_prompt(context: PromptInsert) -> int:
 
     active_file, open_tabs, my_request = parse_prompt_message(context.message)
     cursor = context.conn.execute(
-        """
-        INSERT INTO prompts (
-            file_id, prompt_index, timestamp, message, active_file, open_tabs,
-            my_request, raw_json
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        _SQL_INSERT_PROMPT,
         (
             context.file_id,
             context.prompt_index,
             context.timestamp,
-            safe_value("message", context.message),
-            safe_value("active_file", active_file),
-            safe_value("open_tabs", open_tabs),
-            safe_value("my_request", my_request),
+            context.message,
+            active_file,
+            open_tabs,
+            my_request,
             json_dumps(context.raw),
         ),
     )
     return int(cursor.lastrowid)
 
 
+def _token_row(context: EventInsert) -> tuple[Any, ...]:
+    """Build the bound parameters for a token_messages row."""
+
+    fields = extract_token_fields(context.payload)
+    return (
+        context.prompt_id,
+        context.timestamp,
+        fields["primary_used_percent"],
+        fields["primary_window_minutes"],
+        fields["primary_resets"],
+        fields["secondary_used_percent"],
+        fields["secondary_window_minutes"],
+        fields["secondary_resets"],
+        _raw_json(context),
+    )
+
+
 def insert_token(context: EventInsert) -> None:
     """Persist token usage data."""
 
-    fields = extract_token_fields(context.payload)
-    context.conn.execute(
-        """
-        INSERT INTO token_messages (
-            prompt_id, timestamp,
-            primary_used_percent, primary_window_minutes, primary_resets,
-            secondary_used_percent, secondary_window_minutes, secondary_resets,
-            raw_json
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            context.prompt_id,
-            context.timestamp,
-            fields["primary_used_percent"],
-            fields["primary_window_minutes"],
-            fields["primary_resets"],
-            fields["secondary_used_percent"],
-            fields["secondary_window_minutes"],
-            fields["secondary_resets"],
-            json_dumps(context.raw),
-        ),
+    context.conn.execute(_SQL_INSERT_TOKEN, _token_row(context))
+
+
+def _turn_context_row(context: EventInsert) -> tuple[Any, ...]:
+    """Build the bound parameters for a turn_context_messages row."""
+
+    ctx = extract_turn_context(context.payload)
+    return (
+        context.prompt_id,
+        context.timestamp,
+        ctx["cwd"],
+        ctx["approval_policy"],
+        ctx["sandbox_mode"],
+        ctx["network_access"],
+        ctx["writable_roots"],
+        _raw_json(context),
     )
 
 
 def insert_turn_context(context: EventInsert) -> None:
     """Persist turn context metadata."""
 
-    ctx = extract_turn_context(context.payload)
-    context.conn.execute(
-        """
-        INSERT INTO turn_context_messages (
-            prompt_id, timestamp, cwd, approval_policy, sandbox_mode,
-            network_access, writable_roots, raw_json
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            context.prompt_id,
-            context.timestamp,
-            ctx["cwd"],
-            ctx["approval_policy"],
-            ctx["sandbox_mode"],
-            ctx["network_access"],
-            ctx["writable_roots"],
-            json_dumps(context.raw),
-        ),
+    context.conn.execute(_SQL_INSERT_TURN_CONTEXT, _turn_context_row(context))
+
+
+def _agent_reasoning_row(context: AgentReasoningInsert) -> tuple[Any, ...]:
+    """Build the bound parameters for an agent_reasoning_messages row."""
+
+    return (
+        context.prompt_id,
+        context.timestamp,
+        context.source,
+        get_reasoning_text(context.payload),
+        _raw_json(context),
     )
 
 
 def insert_agent_reasoning(context: AgentReasoningInsert) -> None:
     """Persist agent reasoning content."""
 
-    text = get_reasoning_text(context.payload)
-    context.conn.execute(
-        """
-        INSERT INTO agent_reasoning_messages (
-            prompt_id, timestamp, source, text, raw_json
-        )
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (
-            context.prompt_id,
-            context.timestamp,
-            context.source,
-            text,
-            json_dumps(context.raw),
-        ),
+    context.conn.execute(_SQL_INSERT_REASONING, _agent_reasoning_row(context))
+
+
+def _function_plan_row(context: EventInsert) -> tuple[Any, ...]:
+    """Build the bound parameters for a function_plan_messages row."""
+
+    payload = context.payload
+    return (
+        context.prompt_id,
+        context.timestamp,
+        payload.get("name"),
+        payload.get("arguments"),
+        _raw_json(context),
     )
 
 
 def insert_function_plan(context: EventInsert) -> None:
     """Persist update_plan function calls."""
 
-    context.conn.execute(
+    context.conn.execute(_SQL_INSERT_PLAN, _function_plan_row(context))
+
+
+@dataclass(slots=True)
+class PendingWrites:
+    """Buffer child-table rows for a prompt and flush them with executemany.
+
+    The bound ``insert_*`` and ``update_function_call_output`` methods match
+    the signatures expected by ``EventHandlerDeps`` so buffering can be
+    swapped in without touching the event handlers. Rows are flushed
+    automatically once ``max_rows`` are pending; callers must call
+    :meth:`flush` before committing.
+    """
+
+    conn: Any
+    max_rows: int = 1000
+    rows: dict[str, list[tuple[Any, ...]]] = field(default_factory=dict)
+    pending: int = 0
+    cursor: Any = field(default=None, init=False, repr=False)
+
+    def append(self, sql: str, row: tuple[Any, ...]) -> None:
+        """Queue a row for ``sql`` and flush when the buffer is full."""
+
+        self.rows.setdefault(sql, []).append(row)
+        self.pending += 1
+        if self.pending >= self.max_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all queued rows, grouped by statement.
+
+        Rows keep their queued order within each statement, but statements
+        run one after another in first-queued order, so rows for different
+        tables are not interleaved as they were queued. This is safe because
+        buffered rows only reference prompts and function calls, which are
+        inserted immediately rather than buffered, and no buffered table
+        references another.
+
+        Inserts go out ``_MULTI_ROW_CHUNK`` rows per ``VALUES`` list, which
+        SQLite executes markedly faster than the same rows through
+        ``executemany``; the remainder and non-insert statements still use
+        ``executemany`` so only one statement shape is prepared per table.
         """
-        INSERT INTO function_plan_messages (
-            prompt_id, timestamp, name, arguments, raw_json
+
+        conn = self.conn
+        for sql, rows in self.rows.items():
+            if not rows:
+                continue
+            multi_sql = _MULTI_ROW_SQL.get(sql)
+            full = 0
+            if multi_sql is not None:
+                full = len(rows) - len(rows) % _MULTI_ROW_CHUNK
+                for start in range(0, full, _MULTI_ROW_CHUNK):
+                    chunk = rows[start : start + _MULTI_ROW_CHUNK]
+                    conn.execute(multi_sql, list(chain.from_iterable(chunk)))
+            if full < len(rows):
+                conn.executemany(sql, rows[full:])
+        self.rows.clear()
+        self.pending = 0
+
+    def insert_event(self, context: EventInsert) -> None:
+        """Queue a base event record."""
+
+        self.append(_SQL_INSERT_EVENT, _event_row(context))
+
+    def insert_token(self, context: EventInsert) -> None:
+        """Queue token usage data."""
+
+        self.append(_SQL_INSERT_TOKEN, _token_row(context))
+
+    def insert_turn_context(self, context: EventInsert) -> None:
+        """Queue turn context metadata."""
+
+        self.append(_SQL_INSERT_TURN_CONTEXT, _turn_context_row(context))
+
+    def insert_agent_reasoning(self, context: AgentReasoningInsert) -> None:
+        """Queue agent reasoning content."""
+
+        self.append(_SQL_INSERT_REASONING, _agent_reasoning_row(context))
+
+    def insert_function_plan(self, context: EventInsert) -> None:
+        """Queue update_plan function calls."""
+
+        self.append(_SQL_INSERT_PLAN, _function_plan_row(context))
+
+    def insert_function_call(self, context: FunctionCallInsert) -> int:
+        """Insert a function call row now and return its id.
+
+        The row id is needed to match later outputs, so this write is not
+        buffered; it reuses one cursor rather than allocating one per call.
+        """
+
+        cursor = self.cursor
+        if cursor is None:
+            cursor = self.cursor = self.conn.cursor()
+        cursor.execute(_SQL_INSERT_FUNCTION_CALL, _function_call_row(context))
+        return int(cursor.lastrowid)
+
+    def update_function_call_output(self, context: FunctionCallOutputUpdate) -> None:
+        """Queue the output columns for an already inserted function call."""
+
+        # insert_function_call writes its row immediately, so the target row
+        # always exists before this UPDATE is flushed. Repeat outputs for one
+        # call share this statement's list and keep their order, so the last
+        # one still wins.
+        self.append(
+            _SQL_UPDATE_FUNCTION_CALL_OUTPUT, _function_call_output_row(context)
         )
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (
-            context.prompt_id,
-            context.timestamp,
-            context.payload.get("name"),
-            context.payload.get("arguments"),
-            json_dumps(context.raw),
-        ),
+
+
+def _function_call_row(context: FunctionCallInsert) -> tuple[Any, ...]:
+    """Build the bound parameters for a function_calls row."""
+
+    payload = context.payload
+    return (
+        context.prompt_id,
+        context.timestamp,
+        None,
+        payload.get("name"),
+        payload.get("call_id"),
+        payload.get("arguments"),
+        None,
+        _raw_json(context),
+        None,
     )
 
 
@@ -484,48 +817,34 @@ def insert_function_call(context: FunctionCallInsert) -> int:
     """Persist function calls (non-update_plan) and return row id."""
 
     cursor = context.conn.execute(
-        """
-        INSERT INTO function_calls (
-            prompt_id, call_timestamp, output_timestamp, name, call_id,
-            arguments, output, raw_call_json, raw_output_json
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            context.prompt_id,
-            context.timestamp,
-            None,
-            context.payload.get("name"),
-            context.payload.get("call_id"),
-            context.payload.get("arguments"),
-            None,
-            json_dumps(context.raw),
-            None,
-        ),
+        _SQL_INSERT_FUNCTION_CALL, _function_call_row(context)
     )
     return int(cursor.lastrowid)
 
 
+def _function_call_output_row(context: FunctionCallOutputUpdate) -> tuple[Any, ...]:
+    """Build the bound parameters for a function call output update."""
+
+    return (
+        context.timestamp,
+        context.payload.get("output"),
+        _raw_json(context),
+        context.row_id,
+    )
+
+
 def update_function_call_output(context: FunctionCallOutputUpdate) -> None:
     """Update the stored function call with output payload details."""
 
     context.conn.execute(
-        """
-        UPDATE function_calls
-        SET output_timestamp = ?, output = ?, raw_output_json = ?
-        WHERE id = ?
-        """,
-        (
-            context.timestamp,
-            context.payload.get("output"),
-            json_dumps(context.raw),
-            context.row_id,
-        ),
+        _SQL_UPDATE_FUNCTION_CALL_OUTPUT, _function_call_output_row(context)
     )
 
 
 # Update this tuple when adding/removing exports above.
 __all__ = (
     "json_dumps",
+    "json_dumps_bytes",
     "extract_session_details",
     "extract_token_fields",
     "extract_turn_context",
@@ -537,6 +856,7 @@ __all__ = (
     "AgentReasoningInsert",
     "FunctionCallInsert",
     "FunctionCallOutputUpdate",
+    "PendingWrites",
     "insert_session",
     "insert_prompt",
     "insert_token",
@@ -545,5 +865,6 @@ __all__ = (
     "insert_function_plan",
     "insert_function_call",
     "update_function_call_output",
+    "SafeColumn",
     "SAFE_COLUMNS",
 )
@@ -9,12 +9,15 @@ Date: 2025-10-30
 
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass, field
+from functools import partial
 from typing import Any, Callable, Dict
 
 
 EVENT_HANDLER_EXPORTS: tuple[str, ...] = (
     "EventContext",
+    "EventCounts",
     "EventHandlerDeps",
     "FunctionCallTracker",
     "InsertEventFn",
@@ -44,8 +47,40 @@ InsertFunctionPlanFn = Callable[[EventInsert], None]
 InsertFunctionCallFn = Callable[[FunctionCallInsert], int]
 UpdateFunctionCallOutputFn = Callable[[FunctionCallOutputUpdate], None]
 
+# Pre-encoded raw payload for placeholder call rows, which carry no event.
+_EMPTY_RAW_JSON = "{}"
 
-@dataclass
+
+@dataclass(slots=True)
+class EventCounts:
+    """Per-prompt tallies updated by the event handlers.
+
+    Slotted integer fields keep the per-event increments to plain attribute
+    stores instead of string-keyed dict updates.
+    """
+
+    events: int = 0
+    token_messages: int = 0
+    turn_context_messages: int = 0
+    agent_reasoning_messages: int = 0
+    function_plan_messages: int = 0
+    function_calls: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the tallies keyed by counter name."""
+
+        # Built directly: dataclasses.asdict deep-copies every field.
+        return {
+            "events": self.events,
+            "token_messages": self.token_messages,
+            "turn_context_messages": self.turn_context_messages,
+            "agent_reasoning_messages": self.agent_reasoning_messages,
+            "function_plan_messages": self.function_plan_messages,
+            "function_calls": self.function_calls,
+        }
+
+
+@dataclass(slots=True)
 class EventContext:
     """Container for event-specific data to reduce argument counts."""
 
@@ -55,10 +90,10 @@ class EventContext:
     timestamp: str | None
     payload: dict
     raw_event: dict
-    counts: dict[str, int]
+    counts: EventCounts
 
 
-@dataclass
+@dataclass(slots=True)
 class EventHandlerDeps:
     """Callable dependencies used by the session event handlers."""
 
@@ -71,12 +106,22 @@ class EventHandlerDeps:
     update_function_call_output: UpdateFunctionCallOutputFn
 
 
-@dataclass
+def _coerce_call_id(value: Any) -> str | None:
+    """Return ``value`` when it is a non-empty ``str``, otherwise ``None``.
+
+    The exact class check skips ``isinstance``'s subclass handling; JSON
+    decoders only ever produce plain ``str`` values.
+    """
+
+    return value if value.__class__ is str and value else None
+
+
+@dataclass(slots=True)
 class FunctionCallTracker:
     """Track pending function calls so outputs can be matched accurately."""
 
     by_id: Dict[str, int] = field(default_factory=dict)
-    queue: list[int] = field(default_factory=list)
+    queue: deque[int] = field(default_factory=deque)
 
     def register(self, call_id: str | None, row_id: int) -> None:
         """Register call row by id or queue for later resolution."""
@@ -89,10 +134,12 @@ class FunctionCallTracker:
     def resolve(self, call_id: str | None) -> int | None:
         """Resolve row id for a given call id or fall back to queue."""
 
-        if call_id and call_id in self.by_id:
-            return self.by_id.pop(call_id)
+        if call_id:
+            row_id = self.by_id.pop(call_id, None)
+            if row_id is not None:
+                return row_id
         if self.queue:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
 
@@ -102,50 +149,23 @@ def handle_event_msg(
 ) -> None:
     """Handle event_msg payload variants for a prompt."""
 
-    subtype = event_context.payload.get("type")
+    payload = event_context.payload
     insert_context = EventInsert(
         conn=event_context.conn,
         file_id=event_context.file_id,
         prompt_id=event_context.prompt_id,
         timestamp=event_context.timestamp,
-        payload=event_context.payload,
+        payload=payload,
         raw=event_context.raw_event,
     )
 
     # Insert the base event record first
     deps.insert_event(insert_context)
-    event_context.counts["events"] = event_context.counts.get("events", 0) + 1
-
-    if subtype == "token_count":
-        deps.insert_token(insert_context)
-        event_context.counts["token_messages"] += 1
-        return
-
-    if subtype == "agent_reasoning":
-        _record_agent_reasoning(
-            deps,
-            event_context,
-            insert_context,
-            "event_msg",
-        )
-        return
-
-    if subtype == "turn_aborted":
-        _record_agent_reasoning(
-            deps,
-            event_context,
-            insert_context,
-            "turn_aborted",
-        )
-        return
+    event_context.counts.events += 1
 
-    if subtype == "agent_message":
-        _record_agent_reasoning(
-            deps,
-            event_context,
-            insert_context,
-            "agent_message",
-        )
+    handler = _EVENT_MSG_HANDLERS.get(payload.get("type"))
+    if handler is not None:
+        handler(deps, event_context, insert_context)
 
 
 def handle_turn_context_event(
@@ -163,7 +183,7 @@ def handle_turn_context_event(
         raw=event_context.raw_event,
     )
     deps.insert_turn_context(insert_context)
-    event_context.counts["turn_context_messages"] += 1
+    event_context.counts.turn_context_messages += 1
 
 
 def handle_response_item_event(
@@ -173,62 +193,87 @@ def handle_response_item_event(
 ) -> None:
     """Handle response_item payload variants."""
 
-    subtype = event_context.payload.get("type")
-    if subtype == "reasoning":
+    # Subtypes without a handler (including "reasoning") are ignored.
+    handler = _RESPONSE_ITEM_HANDLERS.get(event_context.payload.get("type"))
+    if handler is not None:
+        handler(deps, event_context, tracker)
+
+
+def _handle_token_count(
+    deps: EventHandlerDeps,
+    event_context: EventContext,
+    insert_context: EventInsert,
+) -> None:
+    """Persist token_count events and update counters."""
+
+    deps.insert_token(insert_context)
+    event_context.counts.token_messages += 1
+
+
+def _handle_function_call(
+    deps: EventHandlerDeps,
+    event_context: EventContext,
+    tracker: FunctionCallTracker,
+) -> None:
+    """Persist function_call items, routing update_plan to its own table."""
+
+    payload = event_context.payload
+    # FunctionCallInsert is an EventInsert, so one context serves both tables.
+    insert_context = FunctionCallInsert(
+        conn=event_context.conn,
+        file_id=event_context.file_id,
+        prompt_id=event_context.prompt_id,
+        timestamp=event_context.timestamp,
+        payload=payload,
+        raw=event_context.raw_event,
+    )
+    if payload.get("name") == "update_plan":
+        deps.insert_function_plan(insert_context)
+        event_context.counts.function_plan_messages += 1
         return
+    _register_function_call(
+        deps,
+        event_context,
+        insert_context,
+        tracker,
+    )
 
-    if subtype == "function_call":
-        insert_context = EventInsert(
-            conn=event_context.conn,
-            file_id=event_context.file_id,
-            prompt_id=event_context.prompt_id,
-            timestamp=event_context.timestamp,
-            payload=event_context.payload,
-            raw=event_context.raw_event,
-        )
-        name = event_context.payload.get("name")
-        if name == "update_plan":
-            deps.insert_function_plan(insert_context)
-            event_context.counts["function_plan_messages"] += 1
-            return
-        _register_function_call(
+
+def _handle_function_call_output(
+    deps: EventHandlerDeps,
+    event_context: EventContext,
+    tracker: FunctionCallTracker,
+) -> None:
+    """Attach function_call_output items to their originating call row."""
+
+    payload = event_context.payload
+    row_id = tracker.resolve(_coerce_call_id(payload.get("call_id")))
+    if row_id is None:
+        # Placeholder call row for an orphan output; it carries no call_id so
+        # it is queued for the next output that cannot be matched by id.
+        row_id = _register_function_call(
             deps,
             event_context,
-            insert_context,
-            tracker,
-        )
-        return
-
-    if subtype == "function_call_output":
-        call_id_value = event_context.payload.get("call_id")
-        call_id = (
-            call_id_value if isinstance(call_id_value, str) and call_id_value else None
-        )
-        row_id = tracker.resolve(call_id)
-        if row_id is None:
-            insert_context = EventInsert(
+            FunctionCallInsert(
                 conn=event_context.conn,
                 file_id=event_context.file_id,
                 prompt_id=event_context.prompt_id,
                 timestamp=None,
                 payload={},
                 raw={},
-            )
-            row_id = _register_function_call(
-                deps,
-                event_context,
-                insert_context,
-                tracker,
-            )
-        deps.update_function_call_output(
-            FunctionCallOutputUpdate(
-                conn=event_context.conn,
-                row_id=row_id,
-                timestamp=event_context.timestamp,
-                payload=event_context.payload,
-                raw=event_context.raw_event,
-            )
+                raw_json=_EMPTY_RAW_JSON,
+            ),
+            tracker,
+        )
+    deps.update_function_call_output(
+        FunctionCallOutputUpdate(
+            conn=event_context.conn,
+            row_id=row_id,
+            timestamp=event_context.timestamp,
+            payload=payload,
+            raw=event_context.raw_event,
         )
+    )
 
 
 def _record_agent_reasoning(
@@ -248,33 +293,40 @@ def _record_agent_reasoning(
             payload=insert_context.payload,
             raw=insert_context.raw,
             source=source,
+            raw_json=insert_context.raw_json,
         )
     )
-    event_context.counts["agent_reasoning_messages"] += 1
+    event_context.counts.agent_reasoning_messages += 1
 
 
 def _register_function_call(
     deps: EventHandlerDeps,
     event_context: EventContext,
-    insert_context: EventInsert,
+    insert_context: FunctionCallInsert,
     tracker: FunctionCallTracker,
 ) -> int:
     """Insert a function call row and track it for later outputs."""
 
-    row_id = deps.insert_function_call(
-        FunctionCallInsert(
-            conn=insert_context.conn,
-            file_id=insert_context.file_id,
-            prompt_id=insert_context.prompt_id,
-            timestamp=insert_context.timestamp,
-            payload=insert_context.payload,
-            raw=insert_context.raw,
-        )
-    )
-    call_id_value = insert_context.payload.get("call_id")
-    call_id = (
-        call_id_value if isinstance(call_id_value, str) and call_id_value else None
-    )
-    tracker.register(call_id, row_id)
-    event_context.counts["function_calls"] += 1
+    row_id = deps.insert_function_call(insert_context)
+    tracker.register(_coerce_call_id(insert_context.payload.get("call_id")), row_id)
+    event_context.counts.function_calls += 1
     return row_id
+
+
+EventMsgHandler = Callable[[EventHandlerDeps, EventContext, EventInsert], None]
+ResponseItemHandler = Callable[
+    [EventHandlerDeps, EventContext, FunctionCallTracker], None
+]
+
+# Subtype dispatch tables; a single dict lookup replaces the if/elif chains.
+_EVENT_MSG_HANDLERS: dict[Any, EventMsgHandler] = {
+    "token_count": _handle_token_count,
+    "agent_reasoning": partial(_record_agent_reasoning, source="event_msg"),
+    "turn_aborted": partial(_record_agent_reasoning, source="turn_aborted"),
+    "agent_message": partial(_record_agent_reasoning, source="agent_message"),
+}
+
+_RESPONSE_ITEM_HANDLERS: dict[Any, ResponseItemHandler] = {
+    "function_call": _handle_function_call,
+    "function_call_output": _handle_function_call_output,
+}
@@ -7,21 +7,65 @@ Date: 2025-10-30
 
 from __future__ import annotations
 
+import importlib
 import json
+import mmap
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 from pathlib import Path
-from typing import Iterable, Iterator
+from typing import Any, Iterable, Iterator
+
+try:
+    _orjson: Any = importlib.import_module("orjson")
+except ModuleNotFoundError:  # pragma: no cover - exercised via test shim
+    _orjson = None
+
+# Day-directory listings run concurrently once a month holds more than this
+# many day directories; smaller months are cheaper to list inline.
+_PARALLEL_LISTING_THRESHOLD = 4
+_LISTING_WORKERS = 8
+
+_entry_name = attrgetter("name")
+
+# orjson reads integers outside the 64-bit range as floats instead of failing.
+# Any such integer has at least 19 digits, so lines with a digit run that long
+# go straight to the stdlib decoder, which keeps them exact.
+_WIDE_DIGIT_RUN = re.compile(rb"\d{19}")
 
 
 class SessionDiscoveryError(RuntimeError):
     """Raised when the requested session file cannot be found."""
 
 
+def _scandir_sorted(parent: Path, *, dirs: bool) -> list[Path]:
+    """Return child directories (or files) of ``parent`` sorted by name.
+
+    ``os.scandir`` reports entry types from the directory listing itself, so
+    the ``is_dir``/``is_file`` checks usually need no extra stat call. Entries
+    are filtered before sorting and only the survivors become ``Path`` objects.
+    """
+
+    with os.scandir(parent) as entries:
+        if dirs:
+            matches = [entry for entry in entries if entry.is_dir()]
+        else:
+            matches = [entry for entry in entries if entry.is_file()]
+    matches.sort(key=_entry_name)
+    return [Path(entry.path) for entry in matches]
+
+
 def iter_sorted_directories(parent: Path) -> Iterable[Path]:
     """Yield child directories sorted by name."""
 
-    for child in sorted(parent.iterdir(), key=lambda p: p.name):
-        if child.is_dir():
-            yield child
+    yield from _scandir_sorted(parent, dirs=True)
+
+
+def _list_session_files(day_dir: Path) -> list[Path]:
+    """Return the files directly under ``day_dir`` sorted by name."""
+
+    return _scandir_sorted(day_dir, dirs=False)
 
 
 def find_first_session_file(root: Path) -> Path:
@@ -30,42 +74,95 @@ def find_first_session_file(root: Path) -> Path:
     for year_dir in iter_sorted_directories(root):
         for month_dir in iter_sorted_directories(year_dir):
             for day_dir in iter_sorted_directories(month_dir):
-                files = sorted(
-                    (p for p in day_dir.iterdir() if p.is_file()),
-                    key=lambda p: p.name,
-                )
+                files = _list_session_files(day_dir)
                 if files:
                     return files[0]
     raise SessionDiscoveryError(f"No session files found under {root}")
 
 
 def iter_session_files(root: Path) -> Iterator[Path]:
-    """Yield all session files under ``root`` sorted by year/month/day/file."""
+    """Yield all session files under ``root`` sorted by year/month/day/file.
 
-    for year_dir in iter_sorted_directories(root):
-        for month_dir in iter_sorted_directories(year_dir):
-            for day_dir in iter_sorted_directories(month_dir):
-                for file_path in sorted(day_dir.iterdir(), key=lambda p: p.name):
-                    if file_path.is_file():
-                        yield file_path
+    Months with more than ``_PARALLEL_LISTING_THRESHOLD`` day directories are
+    listed on a small thread pool; directory reads release the GIL, which
+    helps most on network or cold filesystems. Output order is unchanged.
+    """
+
+    with ThreadPoolExecutor(max_workers=_LISTING_WORKERS) as pool:
+        for year_dir in iter_sorted_directories(root):
+            for month_dir in iter_sorted_directories(year_dir):
+                day_dirs = list(iter_sorted_directories(month_dir))
+                if len(day_dirs) > _PARALLEL_LISTING_THRESHOLD:
+                    listings = pool.map(_list_session_files, day_dirs)
+                else:
+                    listings = map(_list_session_files, day_dirs)
+                for files in listings:
+                    yield from files
+
+
+def _iter_raw_lines(file_path: Path) -> Iterator[bytes]:
+    """Yield the raw lines of ``file_path`` from a read-only memory map.
+
+    Pages are faulted in on demand instead of copying the whole file into one
+    ``bytes`` object. Lines keep their trailing ``\n``; ``\r`` and ``\r\n``
+    are split the same way as ``bytes.splitlines()``.
+    """
+
+    with open(file_path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for chunk in iter(mapped.readline, b""):
+                if b"\r" in chunk:
+                    yield from chunk.splitlines()
+                else:
+                    yield chunk
+
+
+def iter_session_events(file_path: Path) -> Iterator[dict]:
+    """Yield JSONL session events from disk one line at a time.
+
+    The file is memory-mapped and read line by line on the same boundaries as
+    text-mode iteration. Lines are parsed with orjson when available; any line
+    it rejects (NaN literals, lone surrogates, stray Unicode whitespace) is
+    re-parsed with the stdlib decoder so accepted input and error messages
+    match the pure-Python path. Lines that may hold integers outside the
+    64-bit range, which orjson would read as floats, are parsed with the
+    stdlib decoder too, so events do not depend on whether orjson is installed.
+
+    Consumers that validate or transform each event can drain this directly
+    so the parsed events never need to be held in a separate list. The file
+    stays mapped until the generator is exhausted or closed.
+    """
+
+    loads = _orjson.loads if _orjson is not None else None
+    for line_number, raw_line in enumerate(_iter_raw_lines(file_path), 1):
+        if not raw_line or raw_line == b"\n":
+            continue
+        if loads is not None and _WIDE_DIGIT_RUN.search(raw_line) is None:
+            try:
+                event = loads(raw_line)
+            except ValueError:
+                pass
+            else:
+                yield event
+                continue
+        text = raw_line.decode("utf-8").strip()
+        if not text:
+            continue
+        try:
+            event = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise ValueError(
+                f"Failed to parse JSON on line {line_number} of {file_path}: {exc}"
+            ) from exc
+        yield event
 
 
 def load_session_events(file_path: Path) -> list[dict]:
     """Load JSONL session events from disk."""
 
-    events: list[dict] = []
-    with file_path.open("r", encoding="utf-8") as handle:
-        for line_number, raw_line in enumerate(handle, start=1):
-            raw_line = raw_line.strip()
-            if not raw_line:
-                continue
-            try:
-                events.append(json.loads(raw_line))
-            except json.JSONDecodeError as exc:
-                raise ValueError(
-                    f"Failed to parse JSON on line {line_number} of {file_path}: {exc}"
-                ) from exc
-    return events
+    return list(iter_session_events(file_path))
 
 
 def group_by_user_messages(events: Iterable[dict]) -> tuple[list[dict], list[dict]]:
@@ -79,23 +176,49 @@ def group_by_user_messages(events: Iterable[dict]) -> tuple[list[dict], list[dic
               until the next user_message).
     """
 
+    prelude, groups = iter_user_message_groups(events)
+    return prelude, list(groups)
+
+
+def iter_user_message_groups(
+    events: Iterable[dict],
+) -> tuple[list[dict], Iterator[dict]]:
+    """Split off the prelude and lazily yield user-message groups.
+
+    Groups match :func:`group_by_user_messages`, but each one is yielded as
+    soon as the next user message (or the end of ``events``) closes it, so a
+    consumer holds one group at a time. Events up to the first user message
+    are read eagerly to build the prelude.
+
+    Returns:
+        A tuple of the prelude list and an iterator over group dicts.
+    """
+
+    iterator = iter(events)
     prelude: list[dict] = []
-    groups: list[dict] = []
-    current_group: dict | None = None
+    for event in iterator:
+        if event.get("type") == "event_msg":
+            payload = event.get("payload")
+            if isinstance(payload, dict) and payload.get("type") == "user_message":
+                return prelude, _iter_groups(event, iterator)
+        prelude.append(event)
+    return prelude, iter(())
 
-    for event in events:
-        if (
-            event.get("type") == "event_msg"
-            and isinstance(event.get("payload"), dict)
-            and event["payload"].get("type") == "user_message"
-        ):
-            current_group = {"user": event, "events": []}
-            groups.append(current_group)
-            continue
 
-        if current_group is None:
-            prelude.append(event)
-        else:
-            current_group["events"].append(event)
+def _iter_groups(user_event: dict, events: Iterator[dict]) -> Iterator[dict]:
+    """Yield groups anchored at ``user_event`` and each later user message."""
 
-    return prelude, groups
+    group_events: list[dict] = []
+    group = {"user": user_event, "events": group_events}
+    append = group_events.append
+    for event in events:
+        if event.get("type") == "event_msg":
+            payload = event.get("payload")
+            if isinstance(payload, dict) and payload.get("type") == "user_message":
+                yield group
+                group_events = []
+                group = {"user": event, "events": group_events}
+                append = group_events.append
+                continue
+        append(event)
+    yield group
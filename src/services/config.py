@@ -9,10 +9,12 @@ AI-assisted: Updated with Codex (GPT-5).
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+from functools import lru_cache
 import importlib
 import os
 from pathlib import Path
 import sys
+from typing import Any
 
 try:
     _toml_module = importlib.import_module("tomllib")
@@ -22,6 +24,11 @@ except ModuleNotFoundError:  # pragma: no cover - exercised via test shim
 _toml_loads = _toml_module.loads
 _TOMLDecodeError = _toml_module.TOMLDecodeError
 
+# Shared defaults; Path objects are immutable, so one instance serves every
+# config load.
+_DEFAULT_REPORTS_DIR = Path("reports")
+_DEFAULT_SQLITE_PATH = _DEFAULT_REPORTS_DIR / "session_data.sqlite"
+
 
 class ConfigError(RuntimeError):
     """Raised when configuration cannot be loaded or validated."""
@@ -32,7 +39,7 @@ class DatabaseConfig:
     """Database connection preferences."""
 
     backend: str = "sqlite"  # sqlite or postgres
-    sqlite_path: Path = Path("reports") / "session_data.sqlite"
+    sqlite_path: Path = _DEFAULT_SQLITE_PATH
     postgres_dsn: str | None = None
 
 
@@ -40,7 +47,7 @@ class DatabaseConfig:
 class OutputPaths:
     """Output destinations for generated artifacts."""
 
-    reports_dir: Path = Path("reports")
+    reports_dir: Path = _DEFAULT_REPORTS_DIR
 
 
 @dataclass(frozen=True)
@@ -63,8 +70,9 @@ def load_config(config_path: Path | None = None) -> SessionsConfig:
             "Copy user/config.example.toml to user/config.toml and set sessions root."
         )
 
+    stat = path.stat()
     try:
-        data = _toml_loads(path.read_text(encoding="utf-8"))
+        data = _parse_toml(str(path.resolve()), stat.st_mtime_ns, stat.st_size)
     except _TOMLDecodeError as exc:
         raise ConfigError(f"Config at {path} is not valid TOML: {exc}") from exc
 
@@ -96,6 +104,20 @@ def load_config(config_path: Path | None = None) -> SessionsConfig:
     )
 
 
+@lru_cache(maxsize=8)
+def _parse_toml(path_str: str, mtime_ns: int, size: int) -> dict[str, Any]:
+    """Parse a TOML file, caching the result per file version.
+
+    ``mtime_ns`` and ``size`` only key the cache so an edited file is parsed
+    again. The returned tables are shared between calls and must not be
+    mutated.
+    """
+
+    del mtime_ns, size
+    data: dict[str, Any] = _toml_loads(Path(path_str).read_text(encoding="utf-8"))
+    return data
+
+
 def _load_batch_size(ingest_config: dict | None) -> int:
     """Return validated ingest batch size."""
 
@@ -117,7 +139,7 @@ def _load_database_config(
     """Load database configuration with sensible defaults."""
 
     backend = "sqlite"
-    sqlite_path = Path("reports") / "session_data.sqlite"
+    sqlite_path = _DEFAULT_SQLITE_PATH
     postgres_dsn: str | None = None
     user_supplied_sqlite = False
 
@@ -160,7 +182,7 @@ def _load_database_config(
 def _load_outputs_config(outputs_table: dict | None) -> OutputPaths:
     """Load and validate output directory configuration."""
 
-    reports_dir = Path("reports")
+    reports_dir = _DEFAULT_REPORTS_DIR
     user_supplied_reports = False
     if isinstance(outputs_table, dict):
         reports_value = outputs_table.get("reports_dir")
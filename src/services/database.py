@@ -10,9 +10,26 @@ AI-assisted: Updated with Codex (GPT-5).
 
 from __future__ import annotations
 
+import re
 import sqlite3
 from pathlib import Path
 
+# Per-connection prepared statement cache size. Ingest, redaction, and report
+# queries all use constant SQL text, so a generous cache keeps every statement
+# prepared for the lifetime of the connection.
+SQLITE_CACHED_STATEMENTS = 256
+
+# Connection tuning applied by get_connection. WAL lets readers proceed during
+# ingest and, with synchronous=NORMAL, syncs only at checkpoints instead of
+# on every commit. A negative cache_size is in KiB, so -65536 is a 64 MiB page
+# cache.
+SQLITE_PRAGMAS: tuple[str, ...] = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+)
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS files (
@@ -45,6 +62,9 @@ CREATE TABLE IF NOT EXISTS prompts (
     raw_json TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_prompts_file_idx
+    ON prompts(file_id, prompt_index);
+
 CREATE TABLE IF NOT EXISTS redactions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     prompt_id INTEGER REFERENCES prompts(id) ON DELETE CASCADE,
@@ -74,6 +94,9 @@ CREATE TABLE IF NOT EXISTS token_messages (
     raw_json TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_token_messages_prompt
+    ON token_messages(prompt_id);
+
 CREATE TABLE IF NOT EXISTS turn_context_messages (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     prompt_id INTEGER NOT NULL REFERENCES prompts(id) ON DELETE CASCADE,
@@ -86,6 +109,9 @@ CREATE TABLE IF NOT EXISTS turn_context_messages (
     raw_json TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_turn_context_messages_prompt
+    ON turn_context_messages(prompt_id);
+
 CREATE TABLE IF NOT EXISTS agent_reasoning_messages (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     prompt_id INTEGER NOT NULL REFERENCES prompts(id) ON DELETE CASCADE,
@@ -95,6 +121,9 @@ CREATE TABLE IF NOT EXISTS agent_reasoning_messages (
     raw_json TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_agent_reasoning_messages_prompt
+    ON agent_reasoning_messages(prompt_id);
+
 CREATE TABLE IF NOT EXISTS function_plan_messages (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     prompt_id INTEGER NOT NULL REFERENCES prompts(id) ON DELETE CASCADE,
@@ -104,6 +133,9 @@ CREATE TABLE IF NOT EXISTS function_plan_messages (
     raw_json TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_function_plan_messages_prompt
+    ON function_plan_messages(prompt_id);
+
 CREATE TABLE IF NOT EXISTS function_calls (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     prompt_id INTEGER NOT NULL REFERENCES prompts(id) ON DELETE CASCADE,
@@ -117,6 +149,9 @@ CREATE TABLE IF NOT EXISTS function_calls (
     raw_output_json TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_function_calls_prompt_ts
+    ON function_calls(prompt_id, call_timestamp);
+
 CREATE TABLE IF NOT EXISTS events (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
@@ -128,19 +163,59 @@ CREATE TABLE IF NOT EXISTS events (
     data TEXT,
     raw_json TEXT
 );
+
+CREATE INDEX IF NOT EXISTS idx_events_file_type_ts
+    ON events(file_id, event_type, timestamp);
 """
 
 
+# Every table and index SCHEMA creates. ensure_schema skips the script when
+# all of them already exist, so reopening a populated database does not
+# re-parse each CREATE statement.
+_SCHEMA_OBJECTS: frozenset[str] = frozenset(
+    re.findall(r"CREATE (?:TABLE|INDEX) IF NOT EXISTS (\w+)", SCHEMA)
+)
+_SQL_COUNT_SCHEMA_OBJECTS = (
+    "SELECT COUNT(*) FROM sqlite_master WHERE name IN ("
+    + ", ".join("?" * len(_SCHEMA_OBJECTS))
+    + ")"
+)
+
+
 def get_connection(db_path: Path) -> sqlite3.Connection:
-    """Return SQLite connection with foreign keys enabled."""
+    """Return a tuned SQLite connection with foreign keys enabled."""
 
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+    # No column declares a converter-backed type (every column is TEXT,
+    # INTEGER, or REAL), so type detection is left off to skip the per-column
+    # converter lookup on fetch.
+    conn = sqlite3.connect(db_path, cached_statements=SQLITE_CACHED_STATEMENTS)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma).fetchall()
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
 
+def checkpoint_wal(conn: sqlite3.Connection) -> None:
+    """Checkpoint the WAL and truncate it back to zero bytes.
+
+    SQLite's automatic checkpoints are passive and never shrink the ``-wal``
+    file, so long-running writers call this periodically to bound it. A
+    checkpoint that cannot run right now is skipped; the next one catches up.
+    """
+
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    except sqlite3.OperationalError:
+        pass
+
+
 def ensure_schema(conn: sqlite3.Connection) -> None:
     """Apply base schema if tables do not exist."""
 
+    (existing,) = conn.execute(
+        _SQL_COUNT_SCHEMA_OBJECTS, tuple(_SCHEMA_OBJECTS)
+    ).fetchone()
+    if existing == len(_SCHEMA_OBJECTS):
+        return
     conn.executescript(SCHEMA)
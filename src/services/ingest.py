@@ -9,6 +9,8 @@ AI-assisted: Updated with Codex (GPT-5).
 from __future__ import annotations
 
 import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from itertools import islice
@@ -20,10 +22,12 @@ from src.parsers.session_parser import (
     SessionDiscoveryError,
     iter_session_files,
     group_by_user_messages,
-    load_session_events,
+    iter_user_message_groups,
+    iter_session_events,
 )
 from src.parsers.handlers.event_handlers import (
     EventContext,
+    EventCounts,
     EventHandlerDeps,
     FunctionCallTracker,
     handle_event_msg,
@@ -31,6 +35,7 @@ from src.parsers.handlers.event_handlers import (
     handle_turn_context_event,
 )
 from src.parsers.handlers.db_utils import (
+    PendingWrites,
     SessionInsert,
     PromptInsert,
     insert_session,
@@ -43,17 +48,53 @@ from src.parsers.handlers.db_utils import (
     insert_function_call,
     update_function_call_output,
 )
-from src.services.database import ensure_schema, get_connection
+from src.services.database import checkpoint_wal, ensure_schema, get_connection
 from src.services.sanitization import sanitize_json
 from src.services.validation import EventValidationError, validate_event
 
 
 logger = logging.getLogger(__name__)
 
+# Directory ingest truncates the WAL after this many committed sessions so the
+# -wal file stays bounded over long runs.
+WAL_CHECKPOINT_INTERVAL = 50
 
-def build_event_handler_deps() -> EventHandlerDeps:
-    """Return the default EventHandlerDeps wired to db_utils helpers."""
+# Sessions sharing a directory-ingest transaction are isolated by savepoint.
+_SQL_SAVEPOINT = "SAVEPOINT session_ingest"
+_SQL_RELEASE_SAVEPOINT = "RELEASE session_ingest"
+_SQL_ROLLBACK_TO_SAVEPOINT = "ROLLBACK TO session_ingest"
 
+# Refreshes and identifies an existing file row in one statement; a miss
+# returns no row and falls through to the insert.
+_SQL_TOUCH_FILE = (
+    "UPDATE files SET ingested_at = CURRENT_TIMESTAMP WHERE path = ? RETURNING id"
+)
+_SQL_INSERT_FILE = "INSERT INTO files (path) VALUES (?)"
+_SQL_DELETE_FILE_PROMPTS = "DELETE FROM prompts WHERE file_id = ?"
+_SQL_DELETE_FILE_SESSIONS = "DELETE FROM sessions WHERE file_id = ?"
+
+
+def build_event_handler_deps(
+    pending: PendingWrites | None = None,
+) -> EventHandlerDeps:
+    """Return the default EventHandlerDeps wired to db_utils helpers.
+
+    When ``pending`` is supplied, child-table inserts and function call output
+    updates are queued on it and written with ``executemany`` on flush.
+    Function call rows are always inserted immediately because their row ids
+    are needed to match outputs; with a buffer they reuse its cursor.
+    """
+
+    if pending is not None:
+        return EventHandlerDeps(
+            insert_event=pending.insert_event,
+            insert_token=pending.insert_token,
+            insert_turn_context=pending.insert_turn_context,
+            insert_agent_reasoning=pending.insert_agent_reasoning,
+            insert_function_plan=pending.insert_function_plan,
+            insert_function_call=pending.insert_function_call,
+            update_function_call_output=pending.update_function_call_output,
+        )
     return EventHandlerDeps(
         insert_event=insert_event,
         insert_token=insert_token,
@@ -173,15 +214,14 @@ def process_events_in_batches(
     events: Iterator[dict[str, Any]],
     batch_size: int = 1000,
 ) -> Iterator[list[dict[str, Any]]]:
-    """Yield fixed-size batches of events to manage memory usage."""
-
-    batch: list[dict[str, Any]] = []
-    for event in events:
-        batch.append(event)
-        if len(batch) >= batch_size:
-            yield batch
-            batch = []
-    if batch:
+    """Yield fixed-size batches of events to manage memory usage.
+
+    Ingest itself no longer batches events before validation; this remains
+    for callers that chunk an event stream at a write boundary.
+    """
+
+    iterator = iter(events)
+    while batch := list(islice(iterator, batch_size)):
         yield batch
 
 
@@ -202,18 +242,14 @@ class SessionSummary(TypedDict):
 def _ensure_file_row(conn: Connection, session_file: Path) -> int:
     """Return file id, creating or resetting prompt data as needed."""
 
-    cursor = conn.execute("SELECT id FROM files WHERE path = ?", (str(session_file),))
-    row = cursor.fetchone()
+    path = str(session_file)
+    row = conn.execute(_SQL_TOUCH_FILE, (path,)).fetchone()
     if row:
         file_id = int(row[0])
-        conn.execute(
-            "UPDATE files SET ingested_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (file_id,),
-        )
-        conn.execute("DELETE FROM prompts WHERE file_id = ?", (file_id,))
-        conn.execute("DELETE FROM sessions WHERE file_id = ?", (file_id,))
+        conn.execute(_SQL_DELETE_FILE_PROMPTS, (file_id,))
+        conn.execute(_SQL_DELETE_FILE_SESSIONS, (file_id,))
         return file_id
-    cursor = conn.execute("INSERT INTO files (path) VALUES (?)", (str(session_file),))
+    cursor = conn.execute(_SQL_INSERT_FILE, (path,))
     if cursor.lastrowid is None:
         raise ValueError("Failed to retrieve lastrowid from the database.")
     return int(cursor.lastrowid)
@@ -241,6 +277,9 @@ def _build_prompt_insert(
     )
 
 
+_HANDLED_EVENT_TYPES = frozenset(("event_msg", "turn_context", "response_item"))
+
+
 @dataclass
 class EventProcessor:
     """Encapsulate per-prompt event processing to limit local variables."""
@@ -249,41 +288,42 @@ class EventProcessor:
     conn: Any
     file_id: int
     prompt_id: int
-    counts: dict[str, int] = field(
-        default_factory=lambda: {
-            "token_messages": 0,
-            "turn_context_messages": 0,
-            "agent_reasoning_messages": 0,
-            "function_plan_messages": 0,
-            "function_calls": 0,
-        }
-    )
+    counts: EventCounts = field(default_factory=EventCounts)
     tracker: FunctionCallTracker = field(default_factory=FunctionCallTracker)
 
     def process(self, events: Iterable[dict]) -> dict[str, int]:
         """Process all events for the current prompt."""
 
+        # Bind loop invariants once; the body runs for every event in a prompt.
+        deps = self.deps
+        conn = self.conn
+        file_id = self.file_id
+        prompt_id = self.prompt_id
+        counts = self.counts
+        tracker = self.tracker
         for event in events:
+            event_type = event.get("type")
+            if event_type not in _HANDLED_EVENT_TYPES:
+                continue
             payload = event.get("payload")
             if not isinstance(payload, dict):
                 continue
-            event_type = event.get("type")
             context = EventContext(
-                conn=self.conn,
-                file_id=self.file_id,
-                prompt_id=self.prompt_id,
+                conn=conn,
+                file_id=file_id,
+                prompt_id=prompt_id,
                 timestamp=event.get("timestamp"),
                 payload=payload,
                 raw_event=event,
-                counts=self.counts,
+                counts=counts,
             )
             if event_type == "event_msg":
-                handle_event_msg(self.deps, context)
+                handle_event_msg(deps, context)
             elif event_type == "turn_context":
-                handle_turn_context_event(self.deps, context)
-            elif event_type == "response_item":
-                handle_response_item_event(self.deps, context, self.tracker)
-        return self.counts
+                handle_turn_context_event(deps, context)
+            else:
+                handle_response_item_event(deps, context, tracker)
+        return counts.as_dict()
 
 
 def _process_events(
@@ -291,58 +331,93 @@ def _process_events(
     file_id: int,
     prompt_id: int,
     events: Iterable[dict],
+    *,
+    batch_size: int = 1000,
+    pending: PendingWrites | None = None,
+    deps: EventHandlerDeps | None = None,
 ) -> dict[str, int]:
-    """Process events for a prompt and populate child tables."""
+    """Process events for a prompt and populate child tables.
 
-    deps = build_event_handler_deps()
+    When ``pending`` is supplied the buffered rows are left for the caller to
+    flush, so one buffer can span every prompt in a session file. Callers
+    sharing a buffer can pass the ``deps`` built for it once as well.
+    """
+
+    owns_buffer = pending is None
+    if pending is None:
+        pending = PendingWrites(conn=conn, max_rows=batch_size)
+    if deps is None:
+        deps = build_event_handler_deps(pending)
     processor = EventProcessor(
         deps=deps,
         conn=conn,
         file_id=file_id,
         prompt_id=prompt_id,
     )
-    return processor.process(events)
+    counts = processor.process(events)
+    if owns_buffer:
+        pending.flush()
+    return counts
+
+
+def _validated_events(
+    raw_events: Iterable[dict[str, Any]],
+    session_file: Path,
+    errors: list[ProcessingError] | None,
+) -> Iterator[dict[str, Any]]:
+    """Yield normalized events, recording and skipping invalid ones."""
+
+    for index, event in enumerate(raw_events, 1):
+        try:
+            yield validate_jsonl_event(event)
+        except EventValidationError as exc:
+            context_data: dict[str, Any] | None = None
+            # The sanitized copy only feeds the warning log and the error list;
+            # skip the full-payload pass when neither will see it.
+            if isinstance(event, dict) and (
+                errors is not None or logger.isEnabledFor(logging.WARNING)
+            ):
+                context_data = {"event": sanitize_json_for_storage(event)}
+            processing_error = ProcessingError(
+                severity=ErrorSeverity.WARNING,
+                code="invalid_event",
+                message=str(exc),
+                recommended_action=ProcessingErrorAction.CONTINUE,
+                file_path=session_file,
+                line_number=index,
+                context=context_data,
+            )
+            _log_processing_error(processing_error)
+            if errors is not None:
+                errors.append(processing_error)
+
+
+def _iter_prepared_events(
+    raw_events: Iterable[dict[str, Any]],
+    session_file: Path,
+    errors: list[ProcessingError] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield validated, sanitized events one at a time."""
+
+    # Security: redact potential secrets before persisting event payloads.
+    return map(
+        sanitize_json_for_storage,
+        _validated_events(raw_events, session_file, errors),
+    )
 
 
 def _prepare_events(
     raw_events: Iterable[dict[str, Any]],
     session_file: Path,
     errors: list[ProcessingError] | None = None,
-    *,
-    batch_size: int = 1000,
 ) -> list[dict[str, Any]]:
-    """Validate and sanitize raw events before grouping using batches."""
-
-    prepared: list[dict[str, Any]] = []
-    index = 0
-    for batch in process_events_in_batches(
-        iter(raw_events),
-        batch_size=batch_size,
-    ):
-        for event in batch:
-            index += 1
-            try:
-                normalized = validate_jsonl_event(event)
-            except EventValidationError as exc:
-                context_data: dict[str, Any] | None = None
-                if isinstance(event, dict):
-                    context_data = {"event": sanitize_json_for_storage(event)}
-                processing_error = ProcessingError(
-                    severity=ErrorSeverity.WARNING,
-                    code="invalid_event",
-                    message=str(exc),
-                    recommended_action=ProcessingErrorAction.CONTINUE,
-                    file_path=session_file,
-                    line_number=index,
-                    context=context_data,
-                )
-                _log_processing_error(processing_error)
-                if errors is not None:
-                    errors.append(processing_error)
-                continue
-            # Security: redact potential secrets before persisting event payloads.
-            prepared.append(sanitize_json_for_storage(normalized))
-    return prepared
+    """Validate and sanitize raw events before grouping.
+
+    Events stream through validation and sanitization one at a time; only the
+    sanitized copies are collected.
+    """
+
+    return list(_iter_prepared_events(raw_events, session_file, errors))
 
 
 def _create_empty_summary(session_file: Path, file_id: int) -> SessionSummary:
@@ -362,15 +437,44 @@ def _create_empty_summary(session_file: Path, file_id: int) -> SessionSummary:
 
 def _update_summary_counts(summary: SessionSummary, counts: dict) -> None:
     """Update summary with counts from processed events."""
+    get = counts.get
     summary["prompts"] += 1
-    for key in (
-        "token_messages",
-        "turn_context_messages",
-        "agent_reasoning_messages",
-        "function_plan_messages",
-        "function_calls",
-    ):
-        summary[key] += counts.get(key, 0)
+    summary["token_messages"] += get("token_messages", 0)
+    summary["turn_context_messages"] += get("turn_context_messages", 0)
+    summary["agent_reasoning_messages"] += get("agent_reasoning_messages", 0)
+    summary["function_plan_messages"] += get("function_plan_messages", 0)
+    summary["function_calls"] += get("function_calls", 0)
+
+
+@dataclass
+class ParsedSession:
+    """Events parsed, validated, and grouped for one session file."""
+
+    session_file: Path
+    prelude: list[dict]
+    groups: list[dict]
+    errors: list[ProcessingError]
+
+
+def parse_session_file(session_file: Path) -> ParsedSession:
+    """Parse, validate, sanitize, and group a session file without the database.
+
+    Kept at module level so process pools can pickle it by reference.
+    """
+
+    errors: list[ProcessingError] = []
+    # Events are parsed, validated, and sanitized lazily as the grouper pulls
+    # them, so only the grouped sanitized copies are ever held.
+    prepared_events = _iter_prepared_events(
+        iter_session_events(session_file), session_file, errors
+    )
+    prelude, groups = group_by_user_messages(prepared_events)
+    return ParsedSession(
+        session_file=session_file,
+        prelude=prelude,
+        groups=groups,
+        errors=errors,
+    )
 
 
 @dataclass
@@ -382,6 +486,7 @@ class SessionIngester:
     batch_size: int
     verbose: bool
     errors: list[ProcessingError]
+    parsed: ParsedSession | None = None
     file_id: int = field(init=False)
     summary: SessionSummary = field(init=False)
 
@@ -393,20 +498,29 @@ class SessionIngester:
         self.summary = _create_empty_summary(self.session_file, self.file_id)
 
     def process_session(self) -> SessionSummary:
-        """Process all events in the session."""
-        events = load_session_events(self.session_file)
-        prepared_events = _prepare_events(
-            events,
-            self.session_file,
-            self.errors,
-            batch_size=self.batch_size,
-        )
-        prelude, groups = group_by_user_messages(prepared_events)
-        self._store_session_data(prelude, groups)
+        """Process all events in the session.
+
+        Uses ``parsed`` when the session was already parsed elsewhere (for
+        example in a worker process). Otherwise the file is parsed here as
+        prompt groups are stored, so only one group is held at a time.
+        """
+        parsed = self.parsed
+        if parsed is None:
+            prelude, groups = iter_user_message_groups(
+                _iter_prepared_events(
+                    iter_session_events(self.session_file),
+                    self.session_file,
+                    self.errors,
+                )
+            )
+            self._store_session_data(prelude, groups)
+        else:
+            self.errors.extend(parsed.errors)
+            self._store_session_data(parsed.prelude, parsed.groups)
         self._finalize_summary()
         return self.summary
 
-    def _store_session_data(self, prelude: list[dict], groups: list[dict]) -> None:
+    def _store_session_data(self, prelude: list[dict], groups: Iterable[dict]) -> None:
         """Store session data and process prompt groups."""
         insert_session(
             SessionInsert(
@@ -417,8 +531,14 @@ class SessionIngester:
         )
         self._process_groups(groups)
 
-    def _process_groups(self, groups: list[dict]) -> None:
-        """Process and store each prompt group."""
+    def _process_groups(self, groups: Iterable[dict]) -> None:
+        """Process and store each prompt group.
+
+        Child rows from every prompt share one buffer that flushes whenever
+        ``batch_size`` rows are pending and once more after the last prompt.
+        """
+        pending = PendingWrites(conn=self.conn, max_rows=self.batch_size)
+        deps = build_event_handler_deps(pending)
         for index, group in enumerate(groups, start=1):
             prompt_insert = _build_prompt_insert(
                 self.conn,
@@ -432,11 +552,17 @@ class SessionIngester:
                 self.file_id,
                 prompt_id,
                 group["events"],
+                batch_size=self.batch_size,
+                pending=pending,
+                deps=deps,
             )
             _update_summary_counts(self.summary, counts)
+        pending.flush()
 
     def _finalize_summary(self) -> None:
         """Add error information to the summary."""
+        if not self.errors:
+            return  # _create_empty_summary already set an empty list.
         self.summary["errors"] = [
             serialize_processing_error(error) for error in self.errors
         ]
@@ -448,22 +574,48 @@ def _ingest_single_session(
     *,
     verbose: bool = False,
     batch_size: int = 1000,
+    parsed: ParsedSession | None = None,
+    in_transaction: bool = False,
 ) -> SessionSummary:
-    """Internal helper to ingest one session using an existing connection."""
-    conn.execute("BEGIN IMMEDIATE")
+    """Internal helper to ingest one session using an existing connection.
+
+    The whole session is written in one transaction. Foreign keys are
+    checked once at commit rather than per row; SQLite clears
+    ``defer_foreign_keys`` automatically when the transaction ends.
+
+    With ``in_transaction`` the caller owns an open transaction; the session
+    is written under a savepoint that is released on success and rolled back
+    on failure, leaving the commit to the caller. Foreign keys are then
+    checked per statement, so a violation fails this session alone instead
+    of surfacing at the caller's commit and discarding the whole group.
+    """
+    conn.execute(_SQL_SAVEPOINT if in_transaction else "BEGIN IMMEDIATE")
     try:
+        if not in_transaction:
+            conn.execute("PRAGMA defer_foreign_keys = ON")
         ingester = SessionIngester(
             conn=conn,
             session_file=session_file,
             batch_size=batch_size,
             verbose=verbose,
             errors=[],
+            parsed=parsed,
         )
         summary = ingester.process_session()
-        conn.commit()
+        if in_transaction:
+            conn.execute(_SQL_RELEASE_SAVEPOINT)
+        else:
+            conn.commit()
         return summary
-    except Exception:
-        conn.rollback()
+    except BaseException:
+        # Interrupts (KeyboardInterrupt, SystemExit, GeneratorExit) must roll
+        # back too, or a caller's later commit would keep a half-written
+        # session whose buffered child rows were never flushed.
+        if in_transaction:
+            conn.execute(_SQL_ROLLBACK_TO_SAVEPOINT)
+            conn.execute(_SQL_RELEASE_SAVEPOINT)
+        else:
+            conn.rollback()
         raise
 
 
@@ -491,6 +643,30 @@ def ingest_session_file(
         conn.close()
 
 
+def _iter_parsed_sessions(
+    files: Iterable[Path],
+    *,
+    workers: int,
+) -> Iterator[ParsedSession]:
+    """Parse session files on a process pool, yielding results in file order.
+
+    At most ``2 * workers`` files are in flight so parsed sessions do not pile
+    up ahead of the single database writer.
+    """
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    in_flight: deque[Future[ParsedSession]] = deque()
+    try:
+        for session_file in files:
+            in_flight.append(pool.submit(parse_session_file, session_file))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
 def ingest_sessions_in_directory(
     root: Path,
     db_path: Path,
@@ -498,29 +674,87 @@ def ingest_sessions_in_directory(
     limit: int | None = None,
     verbose: bool = False,
     batch_size: int = 1000,
+    workers: int | None = None,
+    commit_every: int = 16,
 ) -> Iterator[SessionSummary]:
-    """Ingest multiple session files beneath ``root``."""
+    """Ingest multiple session files beneath ``root``.
+
+    With ``workers`` above one, files are parsed, validated, and grouped on a
+    process pool while this process performs every database write on a
+    single connection; summaries are still yielded in discovery order.
+
+    Up to ``commit_every`` sessions share one transaction, each under its own
+    savepoint, so a failing file rolls back only its own rows. Summaries are
+    yielded only once the transaction holding their rows has committed; when
+    a file fails, the sessions before it are committed and yielded before the
+    error propagates. An interrupt such as ``KeyboardInterrupt`` rolls back
+    the open group, none of whose summaries were yielded.
+    """
 
     conn = get_connection(db_path)
     ensure_schema(conn)
 
     try:
-        files_iter = iter_session_files(root)
+        files_iter: Iterator[Path] = iter_session_files(root)
         if limit is not None:
             files_iter = islice(files_iter, limit)
 
-        processed = False
-        for session_file in files_iter:
-            processed = True
-            summary = _ingest_single_session(
-                conn,
-                session_file,
-                verbose=verbose,
-                batch_size=batch_size,
+        sessions: Iterator[tuple[Path, ParsedSession | None]]
+        if workers is not None and workers > 1:
+            sessions = (
+                (parsed.session_file, parsed)
+                for parsed in _iter_parsed_sessions(files_iter, workers=workers)
             )
-            yield summary
+        else:
+            sessions = ((session_file, None) for session_file in files_iter)
+
+        processed = False
+        uncommitted: list[SessionSummary] = []
+        since_checkpoint = 0
+        try:
+            for session_file, parsed in sessions:
+                processed = True
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                uncommitted.append(
+                    _ingest_single_session(
+                        conn,
+                        session_file,
+                        verbose=verbose,
+                        batch_size=batch_size,
+                        parsed=parsed,
+                        in_transaction=True,
+                    )
+                )
+                if len(uncommitted) >= commit_every:
+                    conn.commit()
+                    since_checkpoint += len(uncommitted)
+                    if since_checkpoint >= WAL_CHECKPOINT_INTERVAL:
+                        checkpoint_wal(conn)
+                        since_checkpoint = 0
+                    committed, uncommitted = uncommitted, []
+                    yield from committed
+        except Exception:
+            # The failing session already rolled back to its savepoint, so the
+            # rest of the group is intact: commit and report it before raising.
+            if conn.in_transaction:
+                conn.commit()
+            committed, uncommitted = uncommitted, []
+            yield from committed
+            raise
+
+        if conn.in_transaction:
+            conn.commit()
+        yield from uncommitted
 
         if not processed:
             raise SessionDiscoveryError(f"No session files found under {root}")
     finally:
-        conn.close()
+        try:
+            # Every normal and error path above commits before yielding or
+            # raising, so anything still open here was interrupted mid-group
+            # and its summaries were never reported.
+            if conn.in_transaction:
+                conn.rollback()
+        finally:
+            conn.close()
@@ -157,28 +157,22 @@ def apply_rules(
     return result, summary
 
 
-def _apply_regex_rule(text: str, rule: RedactionRule) -> tuple[str, int]:
-    count = 0
+def _literal_template(replacement: str) -> str:
+    """Escape ``replacement`` so ``re.subn`` inserts it verbatim.
 
-    def _repl(_match: re.Match[str]) -> str:
-        nonlocal count
-        count += 1
-        return rule.effective_replacement
+    Backslash is the only special character in a substitution template, so
+    doubling it disables escapes and group references alike.
+    """
 
-    redacted = rule.compiled.sub(_repl, text)
-    return redacted, count
+    return replacement.replace("\\", "\\\\")
 
 
-def _apply_marker_rule(text: str, rule: RedactionRule) -> tuple[str, int]:
-    count = 0
+def _apply_regex_rule(text: str, rule: RedactionRule) -> tuple[str, int]:
+    return rule.compiled.subn(_literal_template(rule.effective_replacement), text)
 
-    def _repl(_match: re.Match[str]) -> str:
-        nonlocal count
-        count += 1
-        return rule.effective_replacement
 
-    redacted = rule.compiled.sub(_repl, text)
-    return redacted, count
+def _apply_marker_rule(text: str, rule: RedactionRule) -> tuple[str, int]:
+    return rule.compiled.subn(_literal_template(rule.effective_replacement), text)
 
 
 def _load_raw(path: Path) -> list[dict[str, Any]]:
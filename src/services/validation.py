@@ -15,6 +15,31 @@ class EventValidationError(ValueError):
     """Raised when a session event is malformed."""
 
 
+# Event and payload type names the ingest handlers dispatch on. Normalized
+# events reuse these (interned literal) objects, so later comparisons and
+# dispatch-table lookups hit the identity fast path with a cached hash.
+# Unknown names are left as-is rather than interned, which would keep
+# arbitrary log strings alive for the life of the process.
+_CANONICAL_TYPES: dict[str, str] = {
+    name: name
+    for name in (
+        "event_msg",
+        "response_item",
+        "turn_context",
+        "session_meta",
+        "user_message",
+        "token_count",
+        "agent_reasoning",
+        "agent_message",
+        "turn_aborted",
+        "function_call",
+        "function_call_output",
+        "message",
+        "reasoning",
+    )
+}
+
+
 def validate_event(event: Any) -> dict[str, Any]:
     """Return a normalized event dict if validation succeeds.
 
@@ -30,6 +55,7 @@ def validate_event(event: Any) -> dict[str, Any]:
     event_type = normalized.get("type")
     if not isinstance(event_type, str) or not event_type.strip():
         raise EventValidationError("Event 'type' must be a non-empty string.")
+    normalized["type"] = _CANONICAL_TYPES.get(event_type, event_type)
 
     timestamp = normalized.get("timestamp")
     if timestamp is not None and not isinstance(timestamp, str):
@@ -39,7 +65,11 @@ def validate_event(event: Any) -> dict[str, Any]:
     if payload is None:
         normalized["payload"] = {}
     elif isinstance(payload, dict):
-        normalized["payload"] = dict(payload)
+        payload = dict(payload)
+        payload_type = payload.get("type")
+        if isinstance(payload_type, str):
+            payload["type"] = _CANONICAL_TYPES.get(payload_type, payload_type)
+        normalized["payload"] = payload
     else:
         raise EventValidationError("Event 'payload' must be a JSON object.")
 
@@ -234,6 +234,23 @@ def test_iter_session_files_yields_all(tmp_path: Path) -> None:
     TC.assertEqual(files, [file1, file2])
 
 
+def test_iter_session_files_orders_parallel_month_listings(tmp_path: Path) -> None:
+    """Months listed on the thread pool should keep year/month/day/file order."""
+    expected: list[Path] = []
+    for month in ("01", "02"):
+        for day in range(1, 8):
+            day_dir = tmp_path / "2025" / month / f"{day:02d}"
+            day_dir.mkdir(parents=True)
+            (day_dir / "nested").mkdir()
+            for name in ("b.jsonl", "a.jsonl"):
+                (day_dir / name).write_text("", encoding="utf-8")
+            expected.extend([day_dir / "a.jsonl", day_dir / "b.jsonl"])
+    (tmp_path / "2025" / "stray.txt").write_text("", encoding="utf-8")
+
+    files = list(session_parser.iter_session_files(tmp_path))
+    TC.assertEqual(files, expected)
+
+
 def test_load_config_honors_batch_override(tmp_path: Path) -> None:
     """load_config should parse TOML and apply ingest batch size override."""
     config_dir = tmp_path / "user"
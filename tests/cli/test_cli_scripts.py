@@ -371,7 +371,9 @@ def test_ingest_single_and_many_paths(
     monkeypatch.setattr(
         ingest_session,
         "ingest_sessions_in_directory",
-        lambda root, db, limit=None, verbose=False, batch_size=5: iter([summary]),
+        lambda root, db, limit=None, verbose=False, batch_size=5, workers=None: iter(
+            [summary]
+        ),
     )
     summaries = ingest_session._ingest_many_files(
         tmp_path, tmp_path / "db.sqlite", None, False, 5
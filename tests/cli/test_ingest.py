@@ -72,7 +72,7 @@ def test_sanitize_json_for_storage_validates_input(
 def test_prepare_events_batch_processing(
     sample_session_file: Path, sample_timestamp: datetime
 ) -> None:
-    """Test that _prepare_events correctly processes events in batches."""
+    """Test that _prepare_events processes every valid event in order."""
     test_case = unittest.TestCase()
 
     # Create test event data
@@ -84,7 +84,7 @@ def test_prepare_events_batch_processing(
 
     events = [test_event, test_event]  # Two identical events
     errors: list[ProcessingError] = []
-    prepared = _prepare_events(events, sample_session_file, errors, batch_size=1)
+    prepared = _prepare_events(events, sample_session_file, errors)
 
     test_case.assertEqual(
         len(prepared), len(events), "All valid events should be processed"
@@ -222,13 +222,37 @@ def test_prepare_events_filters_invalid(sample_session_file: Path) -> None:
         raw_events,  # type: ignore[arg-type]
         sample_session_file,
         errors,
-        batch_size=1,
     )
     TC.assertEqual(len(prepared), 1)
     TC.assertTrue(errors)
     TC.assertEqual(errors[0].code, "invalid_event")
 
 
+def test_prepare_events_skips_unused_error_context(
+    sample_session_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Invalid events should not be sanitized when no one consumes the context."""
+    sanitized: list[dict[str, Any]] = []
+    original = ingest.sanitize_json_for_storage
+
+    def _tracking_sanitize(event: dict[str, Any]) -> dict[str, Any]:
+        sanitized.append(event)
+        return original(event)
+
+    monkeypatch.setattr(ingest, "sanitize_json_for_storage", _tracking_sanitize)
+    monkeypatch.setattr(ingest.logger, "disabled", True)
+    raw_events = [
+        {"type": "event_msg", "payload": {}},
+        {"type": "event_msg", "payload": "bad"},
+    ]
+    prepared = _prepare_events(
+        raw_events,  # type: ignore[arg-type]
+        sample_session_file,
+    )
+    TC.assertEqual(len(prepared), 1)
+    TC.assertEqual(sanitized, [raw_events[0]])
+
+
 def test_ensure_file_row_resets_existing(tmp_path: Path) -> None:
     """_ensure_file_row should reuse file id and clear prior prompt/session rows."""
     conn = ingest.get_connection(tmp_path / "db.sqlite")
@@ -278,6 +302,30 @@ def test_ingest_single_session_rolls_back_on_failure(
     conn.close()
 
 
+def test_ingest_single_session_defers_foreign_keys_until_commit(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Foreign keys should be deferred only for the session transaction."""
+    conn = ingest.get_connection(tmp_path / "deferred.sqlite")
+    ingest.ensure_schema(conn)
+    session_file = tmp_path / "sess.jsonl"
+    session_file.write_text('{"type": "event_msg", "payload": {}}', encoding="utf-8")
+    seen: list[int] = []
+
+    def _record(self: ingest.SessionIngester) -> dict[str, Any]:
+        seen.append(self.conn.execute("PRAGMA defer_foreign_keys").fetchone()[0])
+        return {}
+
+    monkeypatch.setattr(ingest.SessionIngester, "process_session", _record)
+    ingest._ingest_single_session(  # pylint: disable=protected-access
+        conn,
+        session_file,
+    )
+    TC.assertEqual(seen, [1])
+    TC.assertEqual(conn.execute("PRAGMA defer_foreign_keys").fetchone()[0], 0)
+    conn.close()
+
+
 def test_ingest_session_file_rollback_on_db_error(
     tmp_path: Path, monkeypatch: pytest.MonkeyPatch
 ) -> None:
@@ -327,6 +375,243 @@ def test_ingest_sessions_in_directory_handles_limits(
     TC.assertEqual(len(summaries), 1)
 
 
+def test_ingest_sessions_in_directory_checkpoints_wal_periodically(
+    tmp_path: Path, sample_session_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Directory ingest should truncate the WAL every N committed sessions."""
+    root = tmp_path / "root"
+    for index in range(5):
+        day_dir = root / "2025" / "11" / f"{index + 1:02d}"
+        day_dir.mkdir(parents=True)
+        (day_dir / "s.jsonl").write_text(
+            sample_session_file.read_text(encoding="utf-8"), encoding="utf-8"
+        )
+    db_path = tmp_path / "wal.sqlite"
+    real_checkpoint = ingest.checkpoint_wal
+    wal_sizes: list[int] = []
+
+    def _checkpoint(conn: sqlite3.Connection) -> None:
+        real_checkpoint(conn)
+        wal_sizes.append(Path(f"{db_path}-wal").stat().st_size)
+
+    monkeypatch.setattr(ingest, "WAL_CHECKPOINT_INTERVAL", 2)
+    monkeypatch.setattr(ingest, "checkpoint_wal", _checkpoint)
+    summaries = list(ingest.ingest_sessions_in_directory(root, db_path, commit_every=1))
+    TC.assertEqual(len(summaries), 5)
+    TC.assertEqual(wal_sizes, [0, 0])
+
+
+def test_ingest_sessions_in_directory_isolates_failing_file(
+    tmp_path: Path, sample_session_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A failing file rolls back alone; earlier files in its group persist."""
+    root = tmp_path / "root" / "2025" / "11" / "01"
+    root.mkdir(parents=True)
+    for name in ("a.jsonl", "b.jsonl", "c.jsonl"):
+        (root / name).write_text(
+            sample_session_file.read_text(encoding="utf-8"), encoding="utf-8"
+        )
+    db_path = tmp_path / "group.sqlite"
+    real_process = ingest.SessionIngester.process_session
+
+    def _fail_on_b(self: ingest.SessionIngester) -> Any:
+        summary = real_process(self)
+        if self.session_file.name == "b.jsonl":
+            raise RuntimeError("boom")
+        return summary
+
+    monkeypatch.setattr(ingest.SessionIngester, "process_session", _fail_on_b)
+    summaries = ingest.ingest_sessions_in_directory(tmp_path / "root", db_path)
+    TC.assertEqual(Path(next(summaries)["session_file"]).name, "a.jsonl")
+    with pytest.raises(RuntimeError):
+        next(summaries)
+
+    conn = sqlite3.connect(db_path)
+    paths = [Path(row[0]).name for row in conn.execute("SELECT path FROM files")]
+    prompt_files = conn.execute("SELECT COUNT(DISTINCT file_id) FROM prompts")
+    TC.assertEqual(paths, ["a.jsonl"])
+    TC.assertEqual(prompt_files.fetchone()[0], 1)
+    conn.close()
+
+
+def test_ingest_sessions_in_directory_isolates_foreign_key_violation(
+    tmp_path: Path, sample_session_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A foreign key violation fails its own session, not the whole group."""
+    root = tmp_path / "root" / "2025" / "11" / "01"
+    root.mkdir(parents=True)
+    for name in ("a.jsonl", "b.jsonl", "c.jsonl"):
+        (root / name).write_text(
+            sample_session_file.read_text(encoding="utf-8"), encoding="utf-8"
+        )
+    db_path = tmp_path / "fk.sqlite"
+    real_process = ingest.SessionIngester.process_session
+
+    def _orphan_on_b(self: ingest.SessionIngester) -> Any:
+        summary = real_process(self)
+        if self.session_file.name == "b.jsonl":
+            self.conn.execute(
+                "INSERT INTO prompts (file_id, prompt_index) VALUES (?, ?)",
+                (999_999, 1),
+            )
+        return summary
+
+    monkeypatch.setattr(ingest.SessionIngester, "process_session", _orphan_on_b)
+    summaries = ingest.ingest_sessions_in_directory(tmp_path / "root", db_path)
+    TC.assertEqual(Path(next(summaries)["session_file"]).name, "a.jsonl")
+    with pytest.raises(sqlite3.IntegrityError):
+        next(summaries)
+
+    conn = sqlite3.connect(db_path)
+    paths = [Path(row[0]).name for row in conn.execute("SELECT path FROM files")]
+    orphans = conn.execute("SELECT COUNT(*) FROM prompts WHERE file_id = 999999")
+    TC.assertEqual(paths, ["a.jsonl"])
+    TC.assertEqual(orphans.fetchone()[0], 0)
+    TC.assertGreater(conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0], 0)
+    conn.close()
+
+
+def test_ingest_sessions_in_directory_yields_only_committed_sessions(
+    tmp_path: Path, sample_session_file: Path
+) -> None:
+    """Each yielded summary's rows should already be visible to other readers."""
+    root = tmp_path / "root" / "2025" / "11" / "01"
+    root.mkdir(parents=True)
+    for name in ("a.jsonl", "b.jsonl", "c.jsonl"):
+        (root / name).write_text(
+            sample_session_file.read_text(encoding="utf-8"), encoding="utf-8"
+        )
+    db_path = tmp_path / "durable.sqlite"
+    summaries = ingest.ingest_sessions_in_directory(
+        tmp_path / "root", db_path, commit_every=2
+    )
+    for summary in summaries:
+        reader = sqlite3.connect(db_path)
+        row = reader.execute(
+            "SELECT COUNT(*) FROM files WHERE id = ?", (summary["file_id"],)
+        ).fetchone()
+        reader.close()
+        TC.assertEqual(row[0], 1)
+
+
+def test_ingest_sessions_in_directory_rolls_back_interrupted_file(
+    tmp_path: Path, sample_session_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """An interrupt mid-file should leave none of that file's rows behind."""
+    root = tmp_path / "root" / "2025" / "11" / "01"
+    root.mkdir(parents=True)
+    for name in ("a.jsonl", "b.jsonl"):
+        (root / name).write_text(
+            sample_session_file.read_text(encoding="utf-8"), encoding="utf-8"
+        )
+    db_path = tmp_path / "interrupt.sqlite"
+    real_finalize = ingest.SessionIngester._finalize_summary
+
+    def _interrupt_on_b(self: ingest.SessionIngester) -> None:
+        if self.session_file.name == "b.jsonl":
+            raise KeyboardInterrupt
+        real_finalize(self)
+
+    monkeypatch.setattr(ingest.SessionIngester, "_finalize_summary", _interrupt_on_b)
+    summaries = ingest.ingest_sessions_in_directory(
+        tmp_path / "root", db_path, commit_every=1
+    )
+    TC.assertEqual(Path(next(summaries)["session_file"]).name, "a.jsonl")
+    with pytest.raises(KeyboardInterrupt):
+        next(summaries)
+
+    conn = sqlite3.connect(db_path)
+    paths = [Path(row[0]).name for row in conn.execute("SELECT path FROM files")]
+    TC.assertEqual(paths, ["a.jsonl"])
+    TC.assertEqual(conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0], 1)
+    TC.assertEqual(
+        conn.execute("SELECT COUNT(DISTINCT file_id) FROM prompts").fetchone()[0], 1
+    )
+    conn.close()
+
+
+def test_ingest_sessions_in_directory_rolls_back_uncommitted_group_on_interrupt(
+    tmp_path: Path, sample_session_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Sessions in an interrupted group were never yielded and are not kept."""
+    root = tmp_path / "root" / "2025" / "11" / "01"
+    root.mkdir(parents=True)
+    for name in ("a.jsonl", "b.jsonl"):
+        (root / name).write_text(
+            sample_session_file.read_text(encoding="utf-8"), encoding="utf-8"
+        )
+    db_path = tmp_path / "group_interrupt.sqlite"
+    real_finalize = ingest.SessionIngester._finalize_summary
+
+    def _interrupt_on_b(self: ingest.SessionIngester) -> None:
+        if self.session_file.name == "b.jsonl":
+            raise KeyboardInterrupt
+        real_finalize(self)
+
+    monkeypatch.setattr(ingest.SessionIngester, "_finalize_summary", _interrupt_on_b)
+    with pytest.raises(KeyboardInterrupt):
+        list(ingest.ingest_sessions_in_directory(tmp_path / "root", db_path))
+
+    conn = sqlite3.connect(db_path)
+    TC.assertEqual(conn.execute("SELECT COUNT(*) FROM files").fetchone()[0], 0)
+    TC.assertEqual(conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0], 0)
+    conn.close()
+
+
+def test_ingest_sessions_in_directory_commits_when_closed_early(
+    tmp_path: Path, sample_session_file: Path
+) -> None:
+    """Sessions already yielded are committed if the caller stops iterating."""
+    root = tmp_path / "root" / "2025" / "11" / "01"
+    root.mkdir(parents=True)
+    for name in ("a.jsonl", "b.jsonl"):
+        (root / name).write_text(
+            sample_session_file.read_text(encoding="utf-8"), encoding="utf-8"
+        )
+    db_path = tmp_path / "early.sqlite"
+    summaries = ingest.ingest_sessions_in_directory(
+        tmp_path / "root", db_path, commit_every=1
+    )
+    next(summaries)
+    summaries.close()
+
+    conn = sqlite3.connect(db_path)
+    TC.assertEqual(conn.execute("SELECT COUNT(*) FROM files").fetchone()[0], 1)
+    conn.close()
+
+
+def test_ingest_sessions_in_directory_parallel_matches_sequential(
+    tmp_path: Path, sample_session_file: Path, codex_updates_file: Path
+) -> None:
+    """Parsing on worker processes should store the same rows in file order."""
+    root = tmp_path / "root"
+    sources = (sample_session_file, codex_updates_file) * 2
+    for index, source in enumerate(sources):
+        day_dir = root / "2025" / "11" / f"{index + 1:02d}"
+        day_dir.mkdir(parents=True)
+        (day_dir / source.name).write_text(
+            source.read_text(encoding="utf-8"), encoding="utf-8"
+        )
+
+    tables = ("files", "prompts", "events", "function_calls", "token_messages")
+    results = {}
+    for workers in (None, 2):
+        db_path = tmp_path / f"workers_{workers}.sqlite"
+        summaries = list(
+            ingest.ingest_sessions_in_directory(root, db_path, workers=workers)
+        )
+        conn = sqlite3.connect(db_path)
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in tables
+        }
+        conn.close()
+        results[workers] = ([summary["session_file"] for summary in summaries], counts)
+
+    TC.assertEqual(results[None], results[2])
+    TC.assertEqual(len(results[2][0]), 4)
+
+
 def test_ingest_sessions_in_directory_returns_iterator(tmp_path: Path) -> None:
     """ingest_sessions_in_directory should return iterator even before iteration."""
 
@@ -383,7 +668,7 @@ def test_ingest_single_session_propagates_unexpected_errors(
     def _boom(*_args: Any, **_kwargs: Any) -> None:
         raise RuntimeError("explode")
 
-    monkeypatch.setattr(ingest, "load_session_events", _boom)
+    monkeypatch.setattr(ingest, "iter_session_events", _boom)
     with pytest.raises(RuntimeError):
         ingest._ingest_single_session(  # pylint: disable=protected-access
             conn,
@@ -477,3 +762,70 @@ def test_ingest_session_file_success(sample_session_file: Path, tmp_path: Path)
     db_path = tmp_path / "ok.sqlite"
     summary = ingest_session_file(sample_session_file, db_path, batch_size=2)
     TC.assertGreaterEqual(summary["prompts"], 0)
+
+
+def test_session_ingester_buffers_rows_across_prompts(
+    db_connection: sqlite3.Connection,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Child rows from every prompt should share one buffer per session."""
+    session_file = tmp_path / "multi_prompt.jsonl"
+    lines = []
+    for index in range(3):
+        lines.append(
+            {
+                "type": "event_msg",
+                "timestamp": f"t{index}",
+                "payload": {"type": "user_message", "message": f"prompt {index}"},
+            }
+        )
+        lines.append(
+            {
+                "type": "event_msg",
+                "timestamp": f"t{index}",
+                "payload": {"type": "agent_reasoning", "text": f"thought {index}"},
+            }
+        )
+    session_file.write_text(
+        "\n".join(json.dumps(line) for line in lines), encoding="utf-8"
+    )
+    flushes: list[int] = []
+    original_flush = ingest.PendingWrites.flush
+
+    def _tracking_flush(self: ingest.PendingWrites) -> None:
+        flushes.append(self.pending)
+        original_flush(self)
+
+    deps_built: list[ingest.EventHandlerDeps] = []
+    original_build = ingest.build_event_handler_deps
+
+    def _tracking_build(
+        pending: ingest.PendingWrites | None = None,
+    ) -> ingest.EventHandlerDeps:
+        deps_built.append(original_build(pending))
+        return deps_built[-1]
+
+    monkeypatch.setattr(ingest.PendingWrites, "flush", _tracking_flush)
+    monkeypatch.setattr(ingest, "build_event_handler_deps", _tracking_build)
+    ingester = SessionIngester(
+        conn=db_connection,
+        session_file=session_file,
+        batch_size=100,
+        verbose=False,
+        errors=[],
+    )
+
+    summary = ingester.process_session()
+
+    TC.assertEqual(summary["prompts"], 3)
+    TC.assertEqual(summary["agent_reasoning_messages"], 3)
+    TC.assertEqual(flushes, [6])
+    TC.assertEqual(len(deps_built), 1)
+    reasoning_rows = db_connection.execute(
+        "SELECT p.prompt_index, a.text FROM agent_reasoning_messages a "
+        "JOIN prompts p ON p.id = a.prompt_id ORDER BY a.id"
+    ).fetchall()
+    TC.assertEqual(
+        reasoning_rows, [(1, "thought 0"), (2, "thought 1"), (3, "thought 2")]
+    )
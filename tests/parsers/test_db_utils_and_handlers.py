@@ -4,9 +4,12 @@
 
 from __future__ import annotations
 
+import json
+import math
 import sqlite3
 import unittest
 from pathlib import Path
+from typing import Any
 
 import pytest
 
@@ -15,9 +18,11 @@ from src.parsers.handlers.db_utils import (
     EventInsert,
     FunctionCallInsert,
     FunctionCallOutputUpdate,
+    PendingWrites,
     PromptInsert,
     SessionInsert,
     SAFE_COLUMNS,
+    SafeColumn,
     UnsafeColumnError,
     extract_session_details,
     extract_token_fields,
@@ -33,12 +38,16 @@ from src.parsers.handlers.db_utils import (
     insert_session,
     insert_token,
     insert_turn_context,
+    json_dumps,
+    json_dumps_bytes,
     parse_prompt_message,
     safe_value,
     validate_safe_column,
 )
+from src.parsers.handlers import db_utils, event_handlers
 from src.parsers.handlers.event_handlers import (
     EventContext,
+    EventCounts,
     EventHandlerDeps,
     FunctionCallTracker,
     handle_event_msg,
@@ -87,6 +96,8 @@ def test_safe_value_allowlist() -> None:
     TC.assertEqual(safe_value("message", "ok"), "ok")
     with pytest.raises(UnsafeColumnError):
         validate_safe_column("bad_column")
+    TC.assertEqual(safe_value(SafeColumn.MY_REQUEST, "ok"), "ok")
+    TC.assertEqual(SAFE_COLUMNS, {column.value for column in SafeColumn})
 
 
 def test_validate_safe_column_exhaustive_and_case_sensitive() -> None:
@@ -124,7 +135,7 @@ def test_function_call_tracker_prefers_id_over_queue() -> None:
     tracker.register("abc", 2)
 
     TC.assertEqual(tracker.resolve("abc"), 2)
-    TC.assertEqual(tracker.queue, [1])
+    TC.assertEqual(list(tracker.queue), [1])
 
 
 def test_handle_event_msg_unknown_subtype(tmp_path: Path) -> None:
@@ -133,7 +144,7 @@ def test_handle_event_msg_unknown_subtype(tmp_path: Path) -> None:
     conn = _make_connection(tmp_path)
     file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
     deps = _deps_with_real_inserts()
-    counts: dict[str, int] = {"agent_reasoning_messages": 0, "token_messages": 0}
+    counts = EventCounts()
 
     event = EventContext(
         conn=conn,
@@ -145,8 +156,8 @@ def test_handle_event_msg_unknown_subtype(tmp_path: Path) -> None:
         counts=counts,
     )
     handle_event_msg(deps, event)
-    TC.assertEqual(counts["agent_reasoning_messages"], 0)
-    TC.assertEqual(counts["token_messages"], 0)
+    TC.assertEqual(counts.agent_reasoning_messages, 0)
+    TC.assertEqual(counts.token_messages, 0)
     conn.close()
 
 
@@ -223,6 +234,12 @@ def test_parse_and_extract_helpers() -> None:
     TC.assertEqual(get_reasoning_text({"content": "fallback"}), "fallback")
     TC.assertIsNone(get_reasoning_text({}))
     TC.assertIsNone(get_reasoning_text({"summary": []}))
+    TC.assertEqual(
+        get_reasoning_text(
+            {"text": " \n\u2028", "summary": [{"text": "\t"}], "content": "c"}
+        ),
+        "c",
+    )
     TC.assertIsNone(extract_tag_value("no tags here", "cwd"))
     TC.assertIsNone(extract_tag_value("<cwd>missing end", "cwd"))
     TC.assertEqual(
@@ -406,6 +423,65 @@ def test_database_schema_enforces_foreign_keys(tmp_path: Path) -> None:
     conn.close()
 
 
+def test_ensure_schema_skips_script_only_when_schema_is_complete(
+    tmp_path: Path,
+) -> None:
+    """ensure_schema should skip CREATE statements unless an object is missing."""
+
+    conn = get_connection(tmp_path / "schema.sqlite")
+    ensure_schema(conn)
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    ensure_schema(conn)
+    TC.assertFalse(any("CREATE" in sql for sql in statements))
+
+    conn.execute("DROP INDEX idx_redactions_prompt_scope")
+    ensure_schema(conn)
+    conn.set_trace_callback(None)
+    TC.assertIsNotNone(
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'idx_redactions_prompt_scope'"
+        ).fetchone()
+    )
+    conn.close()
+
+
+def test_schema_declares_only_plain_column_types(tmp_path: Path) -> None:
+    """get_connection skips type detection, so no column may need a converter."""
+
+    conn = get_connection(tmp_path / "types.sqlite")
+    ensure_schema(conn)
+    tables = [
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )
+    ]
+    declared = {
+        row[2]
+        for table in tables
+        for row in conn.execute(f"PRAGMA table_info({table})")
+    }
+    TC.assertLessEqual(declared, {"TEXT", "INTEGER", "REAL"})
+    conn.close()
+
+
+def test_reingest_cascade_uses_child_table_indexes(tmp_path: Path) -> None:
+    """Deleting a file's prompts should seek every child table by index."""
+
+    conn = get_connection(tmp_path / "plan.sqlite")
+    ensure_schema(conn)
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM prompts WHERE file_id = ?", (1,)
+    ).fetchall()
+    details = [row[3] for row in plan]
+    TC.assertTrue(details)
+    TC.assertTrue(all(detail.startswith("SEARCH") for detail in details), details)
+    TC.assertIn("idx_prompts_file_idx", details[0])
+    conn.close()
+
+
 def _deps_with_real_inserts() -> EventHandlerDeps:
     """Create EventHandlerDeps wired to real db_utils inserts."""
 
@@ -453,11 +529,7 @@ def test_handle_event_msg_branches(tmp_path: Path) -> None:
     conn = _make_connection(tmp_path)
     file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
     deps = _deps_with_real_inserts()
-    counts: dict[str, int] = {
-        "token_messages": 0,
-        "agent_reasoning_messages": 0,
-        "events": 0,
-    }
+    counts = EventCounts()
 
     token_event = EventContext(
         conn=conn,
@@ -484,8 +556,8 @@ def test_handle_event_msg_branches(tmp_path: Path) -> None:
             ),
         )
 
-    TC.assertEqual(counts["token_messages"], 1)
-    TC.assertEqual(counts["agent_reasoning_messages"], 3)
+    TC.assertEqual(counts.token_messages, 1)
+    TC.assertEqual(counts.agent_reasoning_messages, 3)
     conn.close()
 
 
@@ -495,7 +567,7 @@ def test_handle_event_msg_unknown_type_no_op(tmp_path: Path) -> None:
     conn = _make_connection(tmp_path)
     file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
     deps = _deps_with_real_inserts()
-    counts: dict[str, int] = {"agent_reasoning_messages": 0, "token_messages": 0}
+    counts = EventCounts()
     event = EventContext(
         conn=conn,
         file_id=file_id,
@@ -506,8 +578,8 @@ def test_handle_event_msg_unknown_type_no_op(tmp_path: Path) -> None:
         counts=counts,
     )
     handle_event_msg(deps, event)
-    TC.assertEqual(counts["agent_reasoning_messages"], 0)
-    TC.assertEqual(counts["token_messages"], 0)
+    TC.assertEqual(counts.agent_reasoning_messages, 0)
+    TC.assertEqual(counts.token_messages, 0)
     conn.close()
 
 
@@ -517,7 +589,7 @@ def test_handle_turn_context_event(tmp_path: Path) -> None:
     conn = _make_connection(tmp_path)
     file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
     deps = _deps_with_real_inserts()
-    counts: dict[str, int] = {"turn_context_messages": 0}
+    counts = EventCounts()
     handle_turn_context_event(
         deps,
         EventContext(
@@ -530,7 +602,7 @@ def test_handle_turn_context_event(tmp_path: Path) -> None:
             counts=counts,
         ),
     )
-    TC.assertEqual(counts["turn_context_messages"], 1)
+    TC.assertEqual(counts.turn_context_messages, 1)
     conn.close()
 
 
@@ -541,7 +613,7 @@ def test_handle_response_item_event_calls_and_outputs(tmp_path: Path) -> None:
     file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
     deps = _deps_with_real_inserts()
     tracker = FunctionCallTracker()
-    counts: dict[str, int] = {"function_calls": 0, "function_plan_messages": 0}
+    counts = EventCounts()
 
     # skip reasoning
     handle_response_item_event(
@@ -557,7 +629,7 @@ def test_handle_response_item_event_calls_and_outputs(tmp_path: Path) -> None:
         ),
         tracker,
     )
-    TC.assertEqual(counts["function_calls"], 0)
+    TC.assertEqual(counts.function_calls, 0)
 
     # function_call -> registers
     handle_response_item_event(
@@ -578,7 +650,7 @@ def test_handle_response_item_event_calls_and_outputs(tmp_path: Path) -> None:
         ),
         tracker,
     )
-    TC.assertEqual(counts["function_calls"], 1)
+    TC.assertEqual(counts.function_calls, 1)
 
     # function_call_output with matching id
     handle_response_item_event(
@@ -643,8 +715,8 @@ def test_handle_response_item_event_calls_and_outputs(tmp_path: Path) -> None:
         ),
         tracker,
     )
-    TC.assertEqual(counts["function_plan_messages"], 1)
-    TC.assertEqual(counts["function_calls"], 2)  # includes queued call
+    TC.assertEqual(counts.function_plan_messages, 1)
+    TC.assertEqual(counts.function_calls, 2)  # includes queued call
 
     outputs = conn.execute("SELECT output FROM function_calls ORDER BY id").fetchall()
     TC.assertEqual({row[0] for row in outputs}, {"done", "updated"})
@@ -657,7 +729,7 @@ def test_record_agent_reasoning_sources(tmp_path: Path) -> None:
     conn = _make_connection(tmp_path)
     file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
     deps = _deps_with_real_inserts()
-    counts: dict[str, int] = {"agent_reasoning_messages": 0}
+    counts = EventCounts()
 
     for subtype in ("agent_reasoning", "turn_aborted", "agent_message"):
         handle_event_msg(
@@ -676,3 +748,522 @@ def test_record_agent_reasoning_sources(tmp_path: Path) -> None:
         conn.execute("SELECT COUNT(*) FROM agent_reasoning_messages").fetchone()[0], 3
     )
     conn.close()
+
+
+def test_json_dumps_preserves_unicode_and_falls_back() -> None:
+    """json_dumps should emit UTF-8 text with or without orjson available."""
+
+    payload = {"message": "café ✓", "items": [1, 2]}
+    TC.assertEqual(json.loads(json_dumps(payload)), payload)
+    TC.assertIn("café ✓", json_dumps(payload))
+    TC.assertEqual(json_dumps_bytes(payload).decode("utf-8"), json_dumps(payload))
+
+    # Integers beyond 64 bits are rejected by orjson; stdlib handles them.
+    TC.assertIn(str(2**70), json_dumps({"big": 2**70}))
+
+
+def test_json_dumps_uses_stdlib_without_orjson(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """When orjson is missing the stdlib encoder should be used."""
+
+    monkeypatch.setattr(db_utils, "_orjson", None)
+    TC.assertEqual(json_dumps({"a": "é"}), '{"a":"é"}')
+    TC.assertEqual(json_dumps_bytes({"a": 1}), b'{"a":1}')
+
+
+def test_json_dumps_matches_between_orjson_and_stdlib(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Payloads without exponent-form floats encode identically either way."""
+
+    pytest.importorskip("orjson")
+    payload = {
+        "message": "café ✓",
+        "nested": {"items": [1, 2.5, None, True], "pair": (1, "x")},
+        "nan": math.nan,
+        "bounds": [math.inf, -math.inf],
+        7: "non-string key",
+    }
+    with_orjson = (json_dumps(payload), json_dumps_bytes(payload))
+    monkeypatch.setattr(db_utils, "_orjson", None)
+    without_orjson = (json_dumps(payload), json_dumps_bytes(payload))
+
+    TC.assertEqual(with_orjson, without_orjson)
+    TC.assertIn('"nan":null', without_orjson[0])
+    TC.assertIn('"bounds":[null,null]', without_orjson[0])
+
+
+@pytest.mark.parametrize(
+    ("payload", "same_text"),
+    [
+        ({"big": 2**70, "low": -(2**63) - 1, "u64": 2**64 - 1}, True),
+        ({"u64": 2**64 - 1, "i64": -(2**63), "zero": 0}, True),
+        ({"tiny": 1e-7, "small": 1e-5, "huge": 1e22, "neg": -2.5e-10}, False),
+        ({"values": [0.1, 100.0, -0.0, 5e-324, 1.7976931348623157e308]}, False),
+    ],
+)
+def test_json_dumps_backends_agree_on_numbers(
+    monkeypatch: pytest.MonkeyPatch, payload: dict[str, Any], same_text: bool
+) -> None:
+    """Floats and wide integers should decode to the same values either way.
+
+    Integers are spelled identically by both encoders; float spelling (for
+    example ``1e-7`` versus ``1e-07``) is allowed to differ.
+    """
+
+    pytest.importorskip("orjson")
+    with_orjson = json_dumps(payload)
+    with_orjson_bytes = json_dumps_bytes(payload)
+    monkeypatch.setattr(db_utils, "_orjson", None)
+    without_orjson = json_dumps(payload)
+
+    TC.assertEqual(json.loads(with_orjson), payload)
+    TC.assertEqual(json.loads(without_orjson), payload)
+    TC.assertEqual(with_orjson_bytes.decode("utf-8"), with_orjson)
+    TC.assertNotIn(", ", without_orjson)
+    if same_text:
+        TC.assertEqual(with_orjson, without_orjson)
+
+
+def test_pending_writes_buffers_until_flush(tmp_path: Path) -> None:
+    """Buffered deps should defer child-table rows until flush."""
+
+    conn = _make_connection(tmp_path)
+    file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+    pending = PendingWrites(conn=conn)
+    deps = build_event_handler_deps(pending)
+    counts = EventCounts()
+
+    handle_event_msg(
+        deps,
+        EventContext(
+            conn=conn,
+            file_id=file_id,
+            prompt_id=prompt_id,
+            timestamp="t1",
+            payload={"type": "token_count"},
+            raw_event={"type": "event_msg"},
+            counts=counts,
+        ),
+    )
+    TC.assertEqual(pending.pending, 2)
+    TC.assertEqual(conn.execute("SELECT COUNT(*) FROM events").fetchone()[0], 0)
+
+    pending.flush()
+    TC.assertEqual(pending.pending, 0)
+    TC.assertEqual(conn.execute("SELECT COUNT(*) FROM events").fetchone()[0], 1)
+    TC.assertEqual(conn.execute("SELECT COUNT(*) FROM token_messages").fetchone()[0], 1)
+    conn.close()
+
+
+def test_pending_writes_flushes_at_max_rows(tmp_path: Path) -> None:
+    """PendingWrites should flush automatically once max_rows is reached."""
+
+    conn = _make_connection(tmp_path)
+    file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+    pending = PendingWrites(conn=conn, max_rows=2)
+    for index in range(3):
+        pending.insert_function_plan(
+            EventInsert(
+                conn=conn,
+                file_id=file_id,
+                prompt_id=prompt_id,
+                timestamp=f"t{index}",
+                payload={"name": "update_plan", "arguments": "{}"},
+                raw={"index": index},
+            )
+        )
+    TC.assertEqual(
+        conn.execute("SELECT COUNT(*) FROM function_plan_messages").fetchone()[0], 2
+    )
+    TC.assertEqual(pending.pending, 1)
+    pending.flush()
+    TC.assertEqual(
+        conn.execute("SELECT COUNT(*) FROM function_plan_messages").fetchone()[0], 3
+    )
+    conn.close()
+
+
+def test_parse_prompt_message_skips_preamble_and_free_form_text() -> None:
+    """Text before the first template header should be ignored."""
+
+    TC.assertEqual(
+        parse_prompt_message("# Title\n## Notes\nplain markdown"),
+        (None, None, None),
+    )
+    message = (
+        "Context pasted first\r\n"
+        "  ## Active file: app.py\r\n"
+        "## My request for Codex:\r\n"
+        "Fix it\r\n"
+    )
+    TC.assertEqual(parse_prompt_message(message), ("app.py", None, "Fix it"))
+
+
+def test_extract_session_details_env_context_partial_tags() -> None:
+    """Missing env tags reset to None while an empty cwd keeps the prior value."""
+
+    prelude = [
+        {"type": "session_meta", "payload": {"id": "sid", "cwd": "/meta"}},
+        {
+            "type": "response_item",
+            "payload": {
+                "type": "message",
+                "content": [
+                    {
+                        "text": (
+                            "<environment_context><cwd> </cwd>"
+                            "<sandbox_mode>read-only</sandbox_mode>"
+                            "<sandbox_mode>ignored</sandbox_mode>"
+                            "</environment_context>"
+                        )
+                    }
+                ],
+            },
+        },
+    ]
+    details = extract_session_details(prelude)
+    TC.assertEqual(details["cwd"], "/meta")
+    TC.assertEqual(details["sandbox_mode"], "read-only")
+    TC.assertIsNone(details["approval_policy"])
+    TC.assertIsNone(details["network_access"])
+
+
+def test_insert_contexts_use_slots() -> None:
+    """Per-event context objects should not allocate an instance __dict__."""
+
+    context = AgentReasoningInsert(
+        conn=None,
+        file_id=1,
+        prompt_id=1,
+        timestamp=None,
+        payload={},
+        raw={},
+        source="event_msg",
+    )
+    TC.assertFalse(hasattr(context, "__dict__"))
+    TC.assertFalse(hasattr(FunctionCallTracker(), "__dict__"))
+
+
+def test_extract_token_fields_tolerates_missing_rate_limits() -> None:
+    """Null rate limit sections should normalize to empty token fields."""
+
+    for payload in (
+        {},
+        {"rate_limits": None},
+        {"rate_limits": {"primary": None}},
+        {"rate_limits": []},
+        None,
+    ):
+        fields = extract_token_fields(payload)
+        TC.assertIsNone(fields["primary_used_percent"])
+        TC.assertIsNone(fields["secondary_resets"])
+
+
+def test_raw_json_is_serialized_once_per_event(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The raw event should be encoded once even when stored in two tables."""
+
+    conn = _make_connection(tmp_path)
+    file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+    raw_event = {"type": "event_msg", "payload": {"type": "agent_reasoning"}}
+    encoded: list[Any] = []
+    original = db_utils.json_dumps
+
+    def _tracking_dumps(data: Any) -> str:
+        if data is raw_event:
+            encoded.append(data)
+        return original(data)
+
+    monkeypatch.setattr(db_utils, "json_dumps", _tracking_dumps)
+    handle_event_msg(
+        _deps_with_real_inserts(),
+        EventContext(
+            conn=conn,
+            file_id=file_id,
+            prompt_id=prompt_id,
+            timestamp="t1",
+            payload={"type": "agent_reasoning", "text": "thinking"},
+            raw_event=raw_event,
+            counts=EventCounts(),
+        ),
+    )
+    TC.assertEqual(len(encoded), 1)
+    stored = conn.execute("SELECT raw_json FROM agent_reasoning_messages").fetchone()
+    TC.assertEqual(json.loads(stored[0]), raw_event)
+    conn.close()
+
+
+def test_json_columns_are_stored_as_text(tmp_path: Path) -> None:
+    """Serialized JSON should bind as TEXT so json_extract keeps working."""
+
+    conn = _make_connection(tmp_path)
+    file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+    insert_event(
+        EventInsert(
+            conn=conn,
+            file_id=file_id,
+            prompt_id=prompt_id,
+            timestamp="t1",
+            payload={"type": "note", "detail": "é"},
+            raw={"kind": "raw"},
+        ),
+    )
+    row = conn.execute(
+        "SELECT typeof(data), typeof(raw_json), json_extract(data, '$.detail') "
+        "FROM events"
+    ).fetchone()
+    TC.assertEqual(row, ("text", "text", "é"))
+    conn.close()
+
+
+def test_extract_session_details_prefers_latest_events() -> None:
+    """Later prelude events should override earlier metadata."""
+
+    prelude = [
+        {"type": "session_meta", "payload": {"id": "old", "cwd": "/old"}},
+        {"type": "session_meta", "payload": {"id": "new", "cwd": ""}},
+        {"type": "turn_context", "payload": {"cwd": "/ignored"}},
+    ]
+    details = extract_session_details(prelude)
+    TC.assertEqual(details["session_id"], "new")
+    TC.assertEqual(details["cwd"], "/old")
+
+
+def test_get_connection_applies_wal_tuning(tmp_path: Path) -> None:
+    """get_connection should enable WAL and relaxed syncing."""
+
+    conn = get_connection(tmp_path / "wal.sqlite")
+    TC.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+    TC.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+    TC.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)
+    TC.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -65536)
+    TC.assertEqual(conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+    conn.close()
+
+
+def test_event_counts_start_at_zero_and_convert_to_dict() -> None:
+    """Fresh counts should hold a zero for every handler counter."""
+
+    counts = EventCounts()
+    counts.function_calls += 2
+    TC.assertEqual(
+        counts.as_dict(),
+        {
+            "events": 0,
+            "token_messages": 0,
+            "turn_context_messages": 0,
+            "agent_reasoning_messages": 0,
+            "function_plan_messages": 0,
+            "function_calls": 2,
+        },
+    )
+    TC.assertFalse(hasattr(counts, "__dict__"))
+
+
+def test_event_rows_match_between_direct_and_buffered_inserts(
+    tmp_path: Path,
+) -> None:
+    """Direct and buffered event inserts should share one row builder."""
+
+    conn = _make_connection(tmp_path)
+    file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+
+    def _context(payload: dict) -> EventInsert:
+        return EventInsert(
+            conn=conn,
+            file_id=file_id,
+            prompt_id=prompt_id,
+            timestamp="t1",
+            payload=payload,
+            raw={"payload": payload},
+        )
+
+    insert_event(_context({"note": "direct"}))
+    pending = PendingWrites(conn)
+    pending.insert_event(_context({"note": "direct"}))
+    pending.flush()
+
+    rows = conn.execute(
+        "SELECT event_type, category, priority, session_id, data, raw_json "
+        "FROM events ORDER BY id"
+    ).fetchall()
+    TC.assertEqual(len(rows), 2)
+    TC.assertEqual(rows[0], rows[1])
+    TC.assertEqual(rows[0][:4], ("unknown", "other", "medium", None))
+    conn.close()
+
+
+def test_function_call_output_uses_pre_encoded_raw_json(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Pre-encoded output payloads should be stored without re-encoding."""
+
+    conn = _make_connection(tmp_path)
+    _, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+    tracker = FunctionCallTracker()
+    handle_response_item_event(
+        _deps_with_real_inserts(),
+        EventContext(
+            conn=conn,
+            file_id=1,
+            prompt_id=prompt_id,
+            timestamp="t1",
+            payload={"type": "function_call_output", "output": "orphan"},
+            raw_event={"type": "response_item"},
+            counts=EventCounts(),
+        ),
+        tracker,
+    )
+    row_id = conn.execute("SELECT id FROM function_calls").fetchone()[0]
+
+    def _fail_dumps(data: Any) -> str:
+        raise AssertionError(f"unexpected encode of {data!r}")
+
+    monkeypatch.setattr(db_utils, "json_dumps", _fail_dumps)
+    update_function_call_output(
+        FunctionCallOutputUpdate(
+            conn=conn,
+            row_id=row_id,
+            timestamp="t2",
+            payload={"output": "done"},
+            raw={"ignored": True},
+            raw_json='{"cached": true}',
+        )
+    )
+    row = conn.execute(
+        "SELECT raw_call_json, raw_output_json, output FROM function_calls"
+    ).fetchone()
+    TC.assertEqual(row, ("{}", '{"cached": true}', "done"))
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("abc", "abc"), ("", None), (None, None), (123, None), (["abc"], None)],
+)
+def test_coerce_call_id_accepts_only_non_empty_strings(
+    value: Any, expected: str | None
+) -> None:
+    """Only non-empty string call ids are tracked by id."""
+
+    coerce = event_handlers._coerce_call_id  # pylint: disable=protected-access
+    TC.assertEqual(coerce(value), expected)
+
+
+def test_pending_writes_queue_function_call_outputs(tmp_path: Path) -> None:
+    """Buffered output updates should land on flush and match direct updates."""
+
+    conn = _make_connection(tmp_path)
+    _, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+
+    def _call_and_output(pending: PendingWrites | None) -> int:
+        row_id = insert_function_call(
+            FunctionCallInsert(
+                conn=conn,
+                file_id=0,
+                prompt_id=prompt_id,
+                timestamp="t1",
+                payload={"name": "shell", "call_id": "c1", "arguments": "{}"},
+                raw={},
+            )
+        )
+        update = FunctionCallOutputUpdate(
+            conn=conn,
+            row_id=row_id,
+            timestamp="t2",
+            payload={"output": "done"},
+            raw={"payload": {"output": "done"}},
+        )
+        if pending is None:
+            update_function_call_output(update)
+        else:
+            pending.update_function_call_output(update)
+        return row_id
+
+    direct_id = _call_and_output(None)
+    pending = PendingWrites(conn)
+    buffered_id = _call_and_output(pending)
+    query = (
+        "SELECT output_timestamp, output, raw_output_json "
+        "FROM function_calls WHERE id = ?"
+    )
+    TC.assertEqual(conn.execute(query, (buffered_id,)).fetchone(), (None, None, None))
+
+    pending.flush()
+    TC.assertEqual(
+        conn.execute(query, (buffered_id,)).fetchone(),
+        conn.execute(query, (direct_id,)).fetchone(),
+    )
+    TC.assertEqual(conn.execute(query, (buffered_id,)).fetchone()[1], "done")
+    conn.close()
+
+
+def test_pending_writes_insert_function_call_reuses_cursor(tmp_path: Path) -> None:
+    """Buffered function call inserts should match direct inserts."""
+
+    conn = _make_connection(tmp_path)
+    _, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+
+    def _context(call_id: str) -> FunctionCallInsert:
+        return FunctionCallInsert(
+            conn=conn,
+            file_id=0,
+            prompt_id=prompt_id,
+            timestamp="t1",
+            payload={"name": "shell", "call_id": call_id, "arguments": "{}"},
+            raw={"call_id": call_id},
+        )
+
+    pending = PendingWrites(conn)
+    first = pending.insert_function_call(_context("c1"))
+    cursor = pending.cursor
+    second = pending.insert_function_call(_context("c2"))
+    direct = insert_function_call(_context("c2"))
+
+    TC.assertIs(pending.cursor, cursor)
+    TC.assertEqual([second, direct], [first + 1, first + 2])
+    rows = conn.execute(
+        "SELECT prompt_id, call_timestamp, name, call_id, arguments, raw_call_json "
+        "FROM function_calls WHERE id IN (?, ?) ORDER BY id",
+        (second, direct),
+    ).fetchall()
+    TC.assertEqual(rows[0], rows[1])
+    conn.close()
+
+
+@pytest.mark.parametrize("count", [1, 49, 50, 123])
+def test_pending_writes_multi_row_flush_matches_direct_inserts(
+    tmp_path: Path, count: int
+) -> None:
+    """Chunked multi-row flushes should store the same rows in the same order."""
+
+    conn = _make_connection(tmp_path)
+    file_id, prompt_id = _create_file_and_prompt(conn, "## My request for Codex:\nTest")
+
+    def _context(index: int) -> EventInsert:
+        payload = {"type": "agent_reasoning", "text": f"step {index}"}
+        return EventInsert(
+            conn=conn,
+            file_id=file_id,
+            prompt_id=prompt_id,
+            timestamp=f"t{index}",
+            payload=payload,
+            raw={"payload": payload},
+        )
+
+    for index in range(count):
+        insert_event(_context(index))
+    pending = PendingWrites(conn, max_rows=10_000)
+    for index in range(count):
+        pending.insert_event(_context(index))
+    pending.flush()
+
+    rows = conn.execute(
+        "SELECT timestamp, event_type, data, raw_json FROM events ORDER BY id"
+    ).fetchall()
+    TC.assertEqual(len(rows), 2 * count)
+    TC.assertEqual(rows[:count], rows[count:])
+    conn.close()
@@ -5,7 +5,7 @@
 from __future__ import annotations
 
 import unittest
-from typing import Any
+from typing import Any, Iterator
 from pathlib import Path
 
 import pytest
@@ -70,6 +70,42 @@ def test_group_by_user_messages_handles_empty_events_list() -> None:
     TC.assertEqual(groups, [])
 
 
+def test_iter_user_message_groups_yields_each_group_once_closed() -> None:
+    """Groups should be pulled from the source only as far as needed."""
+
+    events = [
+        {"type": "session_meta", "payload": {"id": "s1"}},
+        {"type": "event_msg", "payload": {"type": "user_message", "message": "1"}},
+        {"type": "event_msg", "payload": {"type": "agent_message", "message": "A"}},
+        {"type": "event_msg", "payload": {"type": "user_message", "message": "2"}},
+        {"type": "event_msg", "payload": {"type": "agent_message", "message": "B"}},
+    ]
+    pulled: list[int] = []
+
+    def _source() -> Iterator[dict[str, Any]]:
+        for index, event in enumerate(events):
+            pulled.append(index)
+            yield event
+
+    prelude, groups = session_parser.iter_user_message_groups(_source())
+    TC.assertEqual(prelude, events[:1])
+    TC.assertEqual(pulled, [0, 1])
+
+    first = next(groups)
+    TC.assertEqual(first, {"user": events[1], "events": [events[2]]})
+    TC.assertEqual(pulled, [0, 1, 2, 3])
+    TC.assertEqual(list(groups), [{"user": events[3], "events": [events[4]]}])
+
+
+def test_iter_user_message_groups_without_user_messages() -> None:
+    """A stream with no user message should be all prelude and no groups."""
+
+    events = [{"type": "session_meta", "payload": {}}]
+    prelude, groups = session_parser.iter_user_message_groups(iter(events))
+    TC.assertEqual(prelude, events)
+    TC.assertEqual(list(groups), [])
+
+
 def test_load_session_events_handles_trailing_partial_json(tmp_path: Path) -> None:
     """load_session_events should fail on malformed JSON lines."""
 
@@ -77,3 +113,87 @@ def test_load_session_events_handles_trailing_partial_json(tmp_path: Path) -> No
     log_file.write_text('{"ok": true}\n{"incomplete": ', encoding="utf-8")
     with pytest.raises(ValueError):
         session_parser.load_session_events(log_file)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_load_session_events_matches_stdlib_parsing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, use_orjson: bool
+) -> None:
+    """Parsing should match the stdlib decoder with or without orjson."""
+
+    if not use_orjson:
+        monkeypatch.setattr(session_parser, "_orjson", None)
+    log_file = tmp_path / "session.jsonl"
+    log_file.write_bytes(
+        b'{"type": "a", "text": "caf\xc3\xa9"}\r\n'
+        b"   \n"
+        b"\xc2\xa0\n"
+        b'{"big": 18446744073709551615}\r'
+        b'{"nan": NaN}\xc2\xa0\n'
+    )
+    events: list[Any] = session_parser.load_session_events(log_file)
+    TC.assertEqual(events[0], {"type": "a", "text": "café"})
+    TC.assertEqual(events[1], {"big": 18446744073709551615})
+    TC.assertIsInstance(events[1]["big"], int)
+    TC.assertEqual(len(events), 3)
+    TC.assertNotEqual(events[2]["nan"], events[2]["nan"])
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_load_session_events_keeps_wide_integers_exact(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, use_orjson: bool
+) -> None:
+    """Integers beyond 64 bits should decode as exact ints on both paths."""
+
+    if not use_orjson:
+        monkeypatch.setattr(session_parser, "_orjson", None)
+    log_file = tmp_path / "session.jsonl"
+    log_file.write_text(
+        f'{{"big": {2**70}, "low": {-(2**63) - 1}}}\n{{"id": "{10**25}"}}\n',
+        encoding="utf-8",
+    )
+    events: list[Any] = session_parser.load_session_events(log_file)
+    TC.assertEqual(events, [{"big": 2**70, "low": -(2**63) - 1}, {"id": str(10**25)}])
+    TC.assertIsInstance(events[0]["big"], int)
+    TC.assertIsInstance(events[0]["low"], int)
+
+
+def test_load_session_events_reports_line_numbers(tmp_path: Path) -> None:
+    """Errors should name the physical line, counting blank lines."""
+
+    log_file = tmp_path / "bad.jsonl"
+    log_file.write_text('{"ok": true}\n\n{"broken"\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="line 3 of"):
+        session_parser.load_session_events(log_file)
+
+
+def test_iter_session_events_is_lazy(tmp_path: Path) -> None:
+    """Events before a malformed line should be yielded before the error."""
+
+    log_file = tmp_path / "partial.jsonl"
+    log_file.write_text('{"n": 1}\n{"n": 2}\n{broken\n', encoding="utf-8")
+    events = session_parser.iter_session_events(log_file)
+    TC.assertEqual(next(events), {"n": 1})
+    TC.assertEqual(next(events), {"n": 2})
+    with pytest.raises(ValueError, match="line 3 of"):
+        next(events)
+
+
+def test_iter_session_events_handles_empty_files_and_carriage_returns(
+    tmp_path: Path,
+) -> None:
+    """Empty files yield nothing and CR/CRLF split lines like splitlines()."""
+
+    empty_file = tmp_path / "empty.jsonl"
+    empty_file.write_bytes(b"")
+    TC.assertEqual(list(session_parser.iter_session_events(empty_file)), [])
+
+    log_file = tmp_path / "crlf.jsonl"
+    log_file.write_bytes(b'{"n": 1}\r\n{"n": 2}\r{"n": 3}\n\n{"n": 4}')
+    TC.assertEqual(
+        list(session_parser.iter_session_events(log_file)),
+        [{"n": 1}, {"n": 2}, {"n": 3}, {"n": 4}],
+    )
+    log_file.write_bytes(b'{"n": 1}\r\n\r{broken\n')
+    with pytest.raises(ValueError, match="line 3 of"):
+        session_parser.load_session_events(log_file)
@@ -10,6 +10,7 @@ import sys
 
 import pytest
 
+from src.services import config as config_module
 from src.services.config import (
     ConfigError,
     SessionsConfig,
@@ -557,3 +558,43 @@ def test_toml_fallback_to_tomli(monkeypatch: Any) -> None:
     TC.assertTrue(hasattr(module, "_toml_loads"))
     TC.assertTrue(hasattr(module, "_TOMLDecodeError"))
     sys.modules.pop("config_temp", None)
+
+
+def test_load_config_caches_parse_until_file_changes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Repeat loads should reuse the parsed TOML until the file is edited."""
+
+    sessions_root = tmp_path / "sessions"
+    sessions_root.mkdir()
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    body = f"""
+        [sessions]
+        root = "{_path_for_toml(sessions_root)}"
+
+        [ingest]
+        batch_size = {{batch}}
+
+        [outputs]
+        reports_dir = "{_path_for_toml(reports_dir)}"
+        """
+    config_path = _write_config(tmp_path, body.format(batch=10))
+    parses: list[str] = []
+    original_loads = config_module._toml_loads  # pylint: disable=protected-access
+
+    def _counting_loads(text: str) -> dict[str, Any]:
+        parses.append(text)
+        return original_loads(text)
+
+    monkeypatch.setattr(config_module, "_toml_loads", _counting_loads)
+    config_module._parse_toml.cache_clear()
+
+    TC.assertEqual(load_config(config_path).ingest_batch_size, 10)
+    TC.assertEqual(load_config(config_path).ingest_batch_size, 10)
+    TC.assertEqual(len(parses), 1)
+
+    _write_config(tmp_path, body.format(batch=2000))
+    TC.assertEqual(load_config(config_path).ingest_batch_size, 2000)
+    TC.assertEqual(len(parses), 2)
+    config_module._parse_toml.cache_clear()
@@ -92,6 +92,21 @@ def test_marker_rule_replaces_inner_content() -> None:
     TC.assertEqual(summary["marker"]["count"], 1)
 
 
+def test_replacement_text_is_inserted_verbatim() -> None:
+    """Backslashes and group references in replacements stay literal."""
+
+    rule = RedactionRule(
+        id="path",
+        type="regex",
+        pattern=r"(user)\d+",
+        options=RuleOptions(replacement=r"C:\new\1 \g<0>"),
+    )
+    redacted, summary = apply_rules("user1 and user22", [rule])
+
+    TC.assertEqual(redacted, r"C:\new\1 \g<0> and C:\new\1 \g<0>")
+    TC.assertEqual(summary["path"]["count"], 2)
+
+
 def test_disabled_rules_are_skipped() -> None:
     """Disabled rules should not apply."""
 
@@ -4,6 +4,7 @@
 
 from __future__ import annotations
 
+import json
 import unittest
 
 import pytest
@@ -69,6 +70,37 @@ def test_sanitize_json_handles_false_negatives_and_casing() -> None:
     TC.assertEqual(sanitized["custom"], "uuidlike-1234-5678-9012-3456")
 
 
+def test_sanitize_json_inline_leaves_match_general_path() -> None:
+    """Leaves in dicts, lists, and tuples should get the same treatment."""
+
+    class Text(str):
+        """str subclass that must still be checked for secrets."""
+
+    payload = {
+        "items": ["sk-live", 3, None, ("rk-abc", 1.5), [{"secret": [1, "x"]}]],
+        "flag": True,
+        "count": 0,
+        "wrapped": Text("Bearer abc"),
+    }
+    sanitized = sanitize_json(payload)
+    TC.assertEqual(
+        sanitized,
+        {
+            "items": [
+                REDACTED,
+                3,
+                None,
+                (REDACTED, 1.5),
+                [{"secret": [REDACTED, REDACTED]}],
+            ],
+            "flag": True,
+            "count": 0,
+            "wrapped": REDACTED,
+        },
+    )
+    TC.assertIsNot(sanitized["items"], payload["items"])
+
+
 def test_sanitize_json_with_missing_markers() -> None:
     """Secrets that don't match heuristics should remain unchanged."""
 
@@ -99,3 +131,14 @@ def test_validate_event_roundtrip_structure() -> None:
     normalized_again = validate_event(normalized)
     TC.assertEqual(normalized_again["metadata"], {"source": "cli"})
     TC.assertEqual(normalized_again["payload"]["type"], "agent_message")
+
+
+def test_validate_event_canonicalizes_known_type_names() -> None:
+    """Known type names should map to shared objects; others pass through."""
+    parsed = json.loads('{"type": "event_msg", "payload": {"type": "token_count"}}')
+    normalized = validate_event(parsed)
+    TC.assertIs(normalized["type"], "event_msg")
+    TC.assertIs(normalized["payload"]["type"], "token_count")
+
+    custom = "".join(["custom", "_type"])
+    TC.assertIs(validate_event({"type": custom})["type"], custom)